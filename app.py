@@ -1,13 +1,22 @@
 import tkinter as tk
 from views.main_views import MainView
 from controllers.controller import AppController
+from utils.constants import LOG_PATH
 
 
 def main():
     root = tk.Tk()
-    view = MainView(root)
+    view = MainView(root, log_path=LOG_PATH)
     controller = AppController(view)
     view.set_controller(controller)
+
+    def on_close():
+        controller.close()
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    root.after_idle(controller.warm_up)
+    root.after_idle(controller.resume_jobs)
     root.mainloop()
 
 
@@ -0,0 +1,154 @@
+# Local stand-in for YouTube used by the benchmarks.
+#
+# MediaServer serves synthetic media over HTTP with Range support and an
+# info endpoint per video id:
+#   /watch/<id>        page URL handed to the model
+#   /info/<id>.json    the info dict LocalMediaIE returns for <id>
+#   /media/<id>.<ext>  the media file itself
+# Every id maps to the same generated payload unless a file was registered
+# for it with add_file(). `rate` caps each connection at that many bytes
+# per second, which is how per-connection throttling is simulated.
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from yt_dlp.extractor.common import InfoExtractor
+
+BLOCK_SIZE = 64 * 1024
+
+
+class LocalMediaIE(InfoExtractor):
+    IE_NAME = "localmedia"
+    _VALID_URL = r"https?://127\.0\.0\.1:\d+/watch/(?P<id>[\w-]+)"
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        base = url.split("/watch/")[0]
+        return self._download_json(f"{base}/info/{video_id}.json", video_id)
+
+
+# YDLPool factory that puts LocalMediaIE in front of yt-dlp's own
+# extractors, so the generic extractor never sees the local URLs.
+def create_ydl(params):
+    from models.ranged import RangedYoutubeDL
+
+    ydl = RangedYoutubeDL(params, auto_init=False)
+    ydl.add_info_extractor(LocalMediaIE())
+    ydl.add_default_info_extractors()
+    return ydl
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server.media
+        match = re.fullmatch(r"/(watch|info|media)/([\w-]+)(?:\.(\w+))?", self.path)
+        if not match:
+            self.send_error(404)
+            return
+        route, video_id, _ = match.groups()
+        if route == "watch":
+            self._send(200, b"<html></html>", "text/html")
+        elif route == "info":
+            if server.info_delay:
+                time.sleep(server.info_delay)
+            body = json.dumps(server.info(video_id, self._base_url())).encode()
+            self._send(200, body, "application/json")
+        else:
+            self._send_media(server.payload(video_id))
+
+    def _base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _send(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self._write(body)
+
+    def _send_media(self, payload):
+        size = len(payload)
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if not match:
+            self._send(200, payload, "application/octet-stream", [("Accept-Ranges", "bytes")])
+            return
+        start = int(match.group(1))
+        end = min(int(match.group(2) or size - 1), size - 1)
+        self._send(206, payload[start:end + 1], "application/octet-stream", [
+            ("Accept-Ranges", "bytes"),
+            ("Content-Range", f"bytes {start}-{end}/{size}"),
+        ])
+
+    def _write(self, body):
+        rate = self.server.media.rate
+        started = time.monotonic()
+        try:
+            for offset in range(0, len(body), BLOCK_SIZE):
+                self.wfile.write(body[offset:offset + BLOCK_SIZE])
+                if rate:
+                    ahead = (offset + BLOCK_SIZE) / rate - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class MediaServer:
+    def __init__(self, size=8 * 1024 * 1024, rate=None, info_delay=0.0):
+        self.rate = rate
+        self.info_delay = info_delay
+        self._payload = os.urandom(size)
+        self._files = {}
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.media = self
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def add_file(self, video_id, path, ext, acodec="aac", vcodec="none"):
+        with open(path, "rb") as f:
+            self._files[video_id] = (f.read(), ext, acodec, vcodec)
+
+    def url(self, video_id):
+        return f"{self.base_url}/watch/{video_id}"
+
+    def payload(self, video_id):
+        return self._files.get(video_id, (self._payload,))[0]
+
+    def info(self, video_id, base_url):
+        payload, ext, acodec, vcodec = self._files.get(
+            video_id, (self._payload, "mp4", "mp4a.40.2", "avc1.640028")
+        )
+        return {
+            "id": video_id,
+            "title": f"sample {video_id}",
+            "duration": 60,
+            "uploader": "benchmark",
+            "formats": [{
+                "format_id": "file",
+                "url": f"{base_url}/media/{video_id}.{ext}",
+                "ext": ext,
+                "filesize": len(payload),
+                "acodec": acodec,
+                "vcodec": vcodec,
+                "protocol": "http",
+            }],
+        }
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,137 @@
+# Startup-time benchmark for the GUI.
+#
+# Each sample runs in a fresh interpreter so imports are cold, and records:
+#   import_ms       importing app, views and controllers
+#   first_frame_ms  until the main window has been built and drawn
+#   first_fetch_ms  until the first fetch_info has returned (this includes
+#                   loading yt-dlp and building the first YoutubeDL)
+# The fetch goes to a file served from a local HTTP server, so the number
+# reflects our own overhead rather than YouTube's latency. Every probe runs
+# in its own empty working directory, so the caches, history and logs the
+# app creates start out empty and never land in the repository.
+#
+#   python benchmarks/startup.py --runs 5 --budget-ms 400
+import argparse
+import functools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "results", "startup.json")
+
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+result = {}
+
+import tkinter as tk
+from views.main_views import MainView
+from controllers.controller import AppController
+result["import_ms"] = (time.perf_counter() - start) * 1000
+
+try:
+    root = tk.Tk()
+except tk.TclError:
+    root = None
+
+if root is not None:
+    view = MainView(root)
+    controller = AppController(view)
+    view.set_controller(controller)
+    root.update()
+    result["first_frame_ms"] = (time.perf_counter() - start) * 1000
+    model = controller.model
+else:
+    from models.downloader import YouTubeDownloader
+    result["first_frame_ms"] = None
+    model = YouTubeDownloader(None)
+
+model.fetch_info(sys.argv[2])
+result["first_fetch_ms"] = (time.perf_counter() - start) * 1000
+
+if root is not None:
+    root.destroy()
+print(json.dumps(result))
+"""
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve(directory):
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def sample(url):
+    with tempfile.TemporaryDirectory() as workdir:
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE, ROOT, url],
+            capture_output=True, text=True, check=True, cwd=workdir,
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples, key):
+    values = [s[key] for s in samples if s.get(key) is not None]
+    if not values:
+        return None
+    return {
+        "median": statistics.median(values),
+        "min": min(values),
+        "max": max(values),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure GUI startup time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--budget-ms", type=float,
+                        help="fail if the median time-to-first-frame exceeds this")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as media_dir:
+        with open(os.path.join(media_dir, "sample.mp4"), "wb") as f:
+            f.write(os.urandom(64 * 1024))
+        server = serve(media_dir)
+        url = f"http://127.0.0.1:{server.server_address[1]}/sample.mp4"
+        try:
+            samples = [sample(url) for _ in range(args.runs)]
+        finally:
+            server.shutdown()
+
+    report = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "samples": samples,
+        **{key: summarize(samples, key)
+           for key in ("import_ms", "first_frame_ms", "first_fetch_ms")},
+    }
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({k: v for k, v in report.items() if k != "samples"}, indent=2))
+
+    frame = report["first_frame_ms"]
+    if args.budget_ms and frame and frame["median"] > args.budget_ms:
+        print(f"time-to-first-frame {frame['median']:.0f} ms exceeds budget "
+              f"{args.budget_ms:.0f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
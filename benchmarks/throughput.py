@@ -0,0 +1,253 @@
+# Throughput and latency benchmark for the model, run entirely offline.
+#
+# A local MediaServer (see local_media.py) stands in for YouTube and
+# LocalMediaIE resolves its URLs, so the numbers cover our own pipeline:
+#   metadata_ms     fetch_info, cold (extraction) and from the cache
+#   single_job      one download, in MB/s
+#   n_jobs          --jobs downloads through the JobScheduler at once
+#   postprocess     handing a file to the post-processing pool, and an
+#                   MP3 conversion when ffmpeg is installed
+#   after_ms        delay of root.after(0, ...) callbacks while idle and
+#                   while the N-job run feeds the real MainView
+# `--rate-mb` throttles every server connection, as YouTube does.
+#
+#   python benchmarks/throughput.py --jobs 4 --size-mb 32 --rate-mb 4
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yt_dlp  # noqa: E402
+
+from benchmarks.local_media import MediaServer, create_ydl  # noqa: E402
+from controllers.scheduler import FAILED, JobScheduler  # noqa: E402
+from models.cache import MetadataCache  # noqa: E402
+from models.downloader import YouTubeDownloader  # noqa: E402
+from models.history import DownloadHistory  # noqa: E402
+from models.options import download_options  # noqa: E402
+from models.ydl_pool import YDLPool  # noqa: E402
+from utils.constants import RANGED_CONNECTIONS  # noqa: E402
+
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "results", "throughput.json")
+MB = 1024 * 1024
+
+
+def summarize(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "median": statistics.median(ordered),
+        "p90": ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))],
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+
+
+def make_model(connections):
+    return YouTubeDownloader(
+        None,
+        pool=YDLPool(factory=create_ydl),
+        cache=MetadataCache(":memory:"),
+        history=DownloadHistory(":memory:"),
+        connections=connections,
+    )
+
+
+def bench_metadata(model, server, runs):
+    cold, cached = [], []
+    for run in range(runs):
+        url = server.url(f"meta{run}")
+        start = time.perf_counter()
+        model.fetch_info(url)
+        cold.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        model.fetch_info(url)
+        cached.append((time.perf_counter() - start) * 1000)
+    return {"cold": summarize(cold), "cached": summarize(cached)}
+
+
+def timed_download(model, url, options, hook=None):
+    start = time.perf_counter()
+    info = model.download(url, options, hook)
+    return time.perf_counter() - start, info
+
+
+def bench_single(model, server, options, runs, size):
+    speeds = []
+    for run in range(runs):
+        seconds, _ = timed_download(model, server.url(f"single{run}"), options)
+        speeds.append(size / MB / seconds)
+    return {"mb_per_s": summarize(speeds)}
+
+
+def bench_parallel(model, server, options, jobs, size, tag, hook=None):
+    scheduler = JobScheduler({"download": jobs})
+    finished = threading.Semaphore(0)
+    scheduler.subscribe(lambda job: job.finished_at and finished.release())
+
+    start = time.perf_counter()
+    submitted = [
+        scheduler.submit(
+            "download", server.url(f"{tag}{n}"),
+            lambda job: model.download(job.url, options, hook),
+        )
+        for n in range(jobs)
+    ]
+    for _ in submitted:
+        finished.acquire()
+    seconds = time.perf_counter() - start
+
+    failed = [str(job.error) for job in submitted if job.state == FAILED]
+    return {
+        "jobs": jobs,
+        "seconds": seconds,
+        "mb_per_s": jobs * size / MB / seconds,
+        "failed": failed,
+    }
+
+
+def make_tone(directory):
+    path = os.path.join(directory, "tone.m4a")
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=440:duration=60",
+         "-c:a", "aac", path],
+        check=True,
+    )
+    return path
+
+
+def bench_postprocess(model, server, download_dir, media_dir):
+    # Hand-off cost of the pool itself: an empty postprocessor list still
+    # ships the info dict to a worker and builds a YoutubeDL there.
+    _, info = timed_download(model, server.url("handoff"), {
+        "format": "file", "outtmpl": f"{download_dir}/%(id)s.%(ext)s",
+    })
+    info = {**info, **info["requested_downloads"][-1]}
+    info.pop("requested_downloads")
+    handoff = []
+    for _ in range(5):
+        start = time.perf_counter()
+        model.postprocess_stage.submit(info, []).result()
+        handoff.append((time.perf_counter() - start) * 1000)
+    result = {"handoff_first_ms": handoff[0], "handoff_ms": summarize(handoff[1:])}
+
+    if not shutil.which("ffmpeg"):
+        result["extract_audio_ms"] = None
+        result["skipped"] = "ffmpeg not found"
+        return result
+
+    server.add_file("tone", make_tone(media_dir), "m4a")
+    options = {**download_options("audio"), "outtmpl": f"{download_dir}/%(id)s.%(ext)s"}
+    options["postprocessors"] = [pp for pp in options["postprocessors"] if pp["key"] != "EmbedThumbnail"]
+    options.pop("writethumbnail")
+    _, info = timed_download(model, server.url("tone"), options)
+    start = time.perf_counter()
+    info["__postprocessing"].result()
+    result["extract_audio_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def bench_after_latency(model, server, options, jobs, size, seconds=2.0):
+    import tkinter as tk
+
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    from views.main_views import MainView
+
+    view = MainView(root)
+    delays = {"idle": [], "under_load": []}
+    phase = ["idle"]
+    done = threading.Event()
+
+    def probe():
+        while not done.is_set():
+            sent = time.perf_counter()
+            bucket = delays[phase[0]]
+            root.after(0, lambda s=sent, b=bucket: b.append((time.perf_counter() - s) * 1000))
+            time.sleep(0.01)
+
+    def load():
+        time.sleep(seconds)
+        phase[0] = "under_load"
+        bench_parallel(model, server, options, jobs, size, "after", view.progress_hook)
+        done.set()
+
+    def check():
+        if done.is_set():
+            root.quit()
+        else:
+            root.after(50, check)
+
+    threading.Thread(target=probe, daemon=True).start()
+    threading.Thread(target=load, daemon=True).start()
+    root.after(50, check)
+    root.mainloop()
+    root.destroy()
+    return {phase: summarize(values) for phase, values in delays.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure download throughput and latency offline.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=4, help="downloads in the parallel run")
+    parser.add_argument("--size-mb", type=float, default=16, help="size of each media file")
+    parser.add_argument("--rate-mb", type=float,
+                        help="per-connection server limit in MB/s (default: unlimited)")
+    parser.add_argument("--info-delay-ms", type=float, default=0,
+                        help="simulated extraction time on the info endpoint")
+    parser.add_argument("--connections", type=int, default=RANGED_CONNECTIONS,
+                        help="range connections per download (1 for a single connection)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    size = int(args.size_mb * MB)
+    server = MediaServer(
+        size=size,
+        rate=args.rate_mb * MB if args.rate_mb else None,
+        info_delay=args.info_delay_ms / 1000,
+    ).start()
+    model = make_model(args.connections)
+
+    with tempfile.TemporaryDirectory() as download_dir, tempfile.TemporaryDirectory() as media_dir:
+        options = {"format": "file", "outtmpl": f"{download_dir}/%(id)s.%(ext)s"}
+        try:
+            report = {
+                "python": sys.version.split()[0],
+                "yt_dlp": yt_dlp.version.__version__,
+                "config": {
+                    "runs": args.runs, "jobs": args.jobs, "size_mb": args.size_mb,
+                    "rate_mb": args.rate_mb, "info_delay_ms": args.info_delay_ms,
+                    "connections": model.connections,
+                },
+                "metadata_ms": bench_metadata(model, server, args.runs),
+                "single_job": bench_single(model, server, options, args.runs, size),
+                "n_jobs": bench_parallel(model, server, options, args.jobs, size, "parallel"),
+                "postprocess": bench_postprocess(model, server, download_dir, media_dir),
+                "after_ms": bench_after_latency(model, server, options, args.jobs, size),
+            }
+        finally:
+            model.close()
+            server.stop()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return 1 if report["n_jobs"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
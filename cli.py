@@ -0,0 +1,285 @@
+# Headless entry point for servers, cron jobs and containers.
+#
+# Reads URLs from the command line, a file (-f) or stdin, runs them through
+# the same scheduler and model as the GUI, and prints one JSON object per
+# line for each job event. Nothing here may import tkinter, Pillow or
+# anything under views/.
+import argparse
+import json
+import sys
+import threading
+import time
+
+from controllers.batch import BatchProgress
+from controllers.scheduler import DONE, FAILED, JobScheduler
+from models.bandwidth import BandwidthGovernor, parse_rate, parse_schedule
+from models.downloader import YouTubeDownloader
+from models.fragments import FragmentBudget
+from models.history import DownloadHistory
+from models.metrics import DownloadMetrics
+from models.postprocess import PostProcessStage
+from models.options import QUALITY_FORMATS, download_options
+from utils.constants import (
+    BANDWIDTH_LIMIT, BANDWIDTH_SCHEDULE, EXPANSION_QUEUE_LIMIT, FRAGMENT_BUDGET,
+    MAX_CONCURRENT_DOWNLOADS, MAX_CONCURRENT_EXPANSIONS, MAX_CONCURRENT_FETCHES,
+    MAX_JOBS_PER_HOST, RANGED_CONNECTIONS
+)
+from utils.urls import is_playlist_url, parse_url_list
+
+PROGRESS_INTERVAL = 1.0
+
+
+class JsonLinesReporter:
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        line = json.dumps({"event": event, "time": time.time(), **fields},
+                          ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def read_urls(args):
+    text = "\n".join(u for u in args.urls if u != "-")
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            text += "\n" + f.read()
+    if "-" in args.urls or (not args.urls and not args.file and not sys.stdin.isatty()):
+        text += "\n" + sys.stdin.read()
+    return parse_url_list(text)
+
+
+def build_options(args):
+    options = download_options("audio" if args.audio else "video", args.quality)
+    if args.format:
+        options["format"] = args.format
+    if args.output:
+        options["outtmpl"] = args.output
+    return options
+
+
+def report_history(args):
+    history = DownloadHistory()
+    reporter = JsonLinesReporter()
+    for record in history.recent(args.history):
+        reporter.emit("history", **record)
+    reporter.emit("history_totals", **history.totals())
+    history.close()
+    return 0
+
+
+def run(args):
+    if args.history:
+        return report_history(args)
+
+    urls = read_urls(args)
+    if not urls:
+        print("No URLs given.", file=sys.stderr)
+        return 2
+
+    reporter = JsonLinesReporter()
+    model = YouTubeDownloader(
+        None,
+        postprocess_stage=PostProcessStage(args.pp_workers),
+        fragments=FragmentBudget(args.fragment_budget),
+        connections=args.connections,
+        metrics=DownloadMetrics(args.metrics),
+        bandwidth=BandwidthGovernor(args.bandwidth, args.bandwidth_schedule),
+    )
+    scheduler = JobScheduler(
+        {"download": args.jobs, "fetch": args.fetch_jobs,
+         "expand": MAX_CONCURRENT_EXPANSIONS},
+        per_host_limit=args.per_host,
+    )
+    batch = BatchProgress()
+    finished = threading.Event()
+
+    def check_finished(*_):
+        if batch.done:
+            finished.set()
+
+    def on_job_changed(job):
+        if job.state in (DONE, FAILED):
+            check_finished()
+
+    scheduler.subscribe(on_job_changed)
+
+    def fetch_task(index, url):
+        def task(job):
+            try:
+                info = model.fetch_info(url)
+            except Exception as e:
+                batch.finish(index, False)
+                reporter.emit("error", job=index, url=url, error=str(e))
+                raise
+            batch.finish(index, True)
+            reporter.emit("info", job=index, url=url, **{
+                key: info.get(key) for key in (
+                    "id", "title", "uploader", "duration",
+                    "view_count", "like_count", "webpage_url",
+                )
+            })
+            return info
+        return task
+
+    def download_task(index, url, options):
+        last_report = [0.0]
+
+        def hook(d):
+            batch.update(index, d)
+            now = time.monotonic()
+            if d["status"] == "downloading" and now - last_report[0] < PROGRESS_INTERVAL:
+                return
+            last_report[0] = now
+            reporter.emit(
+                "progress", job=index, status=d["status"],
+                downloaded_bytes=d.get("downloaded_bytes"),
+                total_bytes=d.get("total_bytes") or d.get("total_bytes_estimate"),
+                speed=d.get("speed"), eta=d.get("eta"),
+            )
+
+        def task(job):
+            reporter.emit("started", job=index, url=url)
+            try:
+                info = model.download(url, options, hook)
+            except Exception as e:
+                batch.finish(index, False)
+                reporter.emit("error", job=index, url=url, error=str(e))
+                raise
+            pending = info.get("__postprocessing")
+            if pending is None:
+                downloads = info.get("requested_downloads") or [{}]
+                finish(info, downloads[-1].get("filepath"))
+            else:
+                reporter.emit("postprocessing", job=index, url=url)
+                pending.add_done_callback(lambda f: postprocessed(info, f))
+            return info
+
+        def finish(info, filepath):
+            batch.finish(index, True)
+            timer = info["__timer"]
+            reporter.emit("done", job=index, url=url, title=info.get("title"),
+                          filepath=filepath, bytes=timer.bytes, retries=timer.retries,
+                          phases=timer.durations(), postprocessors=timer.postprocessors)
+
+        def postprocessed(info, future):
+            error = future.exception()
+            if error:
+                batch.finish(index, False)
+                reporter.emit("error", job=index, url=url, error=str(error))
+            else:
+                finish(info, future.result()["filepath"])
+            check_finished()
+
+        return task
+
+    options = build_options(args)
+
+    def skip_if_downloaded(url):
+        if args.force:
+            return False
+        previous = model.already_downloaded(url, options)
+        if previous:
+            reporter.emit("skipped", url=url, filepath=previous["output_path"])
+        return bool(previous)
+
+    def queue(url):
+        index = batch.add_job()
+        reporter.emit("queued", job=index, url=url)
+        if args.info_only:
+            scheduler.submit("fetch", url, fetch_task(index, url))
+        else:
+            scheduler.submit("download", url, download_task(index, url, options))
+
+    def expand_task(url):
+        def task(job):
+            reporter.emit("expanding", url=url)
+            try:
+                for entry_url, _ in model.iter_entries(url):
+                    if skip_if_downloaded(entry_url):
+                        continue
+                    while scheduler.queued("download") >= EXPANSION_QUEUE_LIMIT:
+                        time.sleep(0.5)
+                    queue(entry_url)
+            except Exception as e:
+                reporter.emit("error", url=url, error=str(e))
+                raise
+            finally:
+                batch.close_expansion()
+        return task
+
+    playlists = [] if args.info_only else [u for u in urls if is_playlist_url(u)]
+    for url in playlists:
+        batch.open_expansion()
+    for url in urls:
+        if url in playlists or (not args.info_only and skip_if_downloaded(url)):
+            continue
+        queue(url)
+    for url in playlists:
+        scheduler.submit("expand", url, expand_task(url))
+
+    if batch.done:
+        finished.set()
+
+    try:
+        finished.wait()
+    except KeyboardInterrupt:
+        reporter.emit("interrupted", **batch.summary())
+        return 130
+    finally:
+        model.close()
+
+    summary = batch.summary()
+    reporter.emit("summary", **summary)
+    if not args.info_only:
+        reporter.emit("metrics", **model.metrics.snapshot())
+    return 1 if summary["failed"] else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Download YouTube videos or audio without the GUI."
+    )
+    parser.add_argument("urls", nargs="*", help="video URLs, or - to read from stdin")
+    parser.add_argument("-f", "--file", help="read URLs from a file, one per line")
+    parser.add_argument("-a", "--audio", action="store_true", help="download audio as MP3")
+    parser.add_argument("-q", "--quality", choices=list(QUALITY_FORMATS), default="1080p")
+    parser.add_argument("--format", help="raw yt-dlp format expression (overrides --quality)")
+    parser.add_argument("-o", "--output", help="yt-dlp output template")
+    parser.add_argument("-j", "--jobs", type=int, default=MAX_CONCURRENT_DOWNLOADS,
+                        help="concurrent downloads")
+    parser.add_argument("--fetch-jobs", type=int, default=MAX_CONCURRENT_FETCHES,
+                        help="concurrent metadata fetches")
+    parser.add_argument("--pp-workers", type=int,
+                        help="post-processing processes (default: one per CPU)")
+    parser.add_argument("--per-host", type=int, default=MAX_JOBS_PER_HOST,
+                        help="concurrent jobs per host (0 for no limit)")
+    parser.add_argument("--fragment-budget", type=int, default=FRAGMENT_BUDGET,
+                        help="concurrent DASH/HLS fragments shared by all downloads")
+    parser.add_argument("--connections", type=int, default=RANGED_CONNECTIONS,
+                        help="parallel range connections per single-file download (1 to disable)")
+    parser.add_argument("--bandwidth", type=parse_rate, default=BANDWIDTH_LIMIT, metavar="RATE",
+                        help="cap on the combined download rate, e.g. 4M (default: none)")
+    parser.add_argument("--bandwidth-schedule", type=parse_schedule,
+                        default=BANDWIDTH_SCHEDULE, metavar="WINDOWS",
+                        help='time-of-day caps, e.g. "09:00-18:00=2M,18:00-09:00=0"')
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write job metrics here after every job (.json, else Prometheus text)")
+    parser.add_argument("--info-only", action="store_true",
+                        help="print metadata instead of downloading")
+    parser.add_argument("--force", action="store_true",
+                        help="download again even if the history has the video")
+    parser.add_argument("--history", type=int, nargs="?", const=50, metavar="N",
+                        help="print the last N completed downloads and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    return run(parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
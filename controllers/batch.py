@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import deque
+
+SPEED_WINDOW = 5.0
+
+
+# Aggregates yt-dlp progress dicts from every job in a batch into one set
+# of totals. Each job may download several files (video + audio streams),
+# so bytes are tracked per (job, filename). Jobs can keep being added while
+# a playlist is still being expanded; the batch is only done once every
+# expansion has closed and every job has finished.
+class BatchProgress:
+    def __init__(self, total_jobs=0):
+        self.total_jobs = total_jobs
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.expanding = 0
+        self.started_at = time.monotonic()
+        self._files = {}
+        self._job_totals = {}
+        self._downloaded = 0
+        self._transferred = 0
+        self._samples = deque()
+        self._lock = threading.Lock()
+
+    def update(self, job_key, d):
+        downloaded = d.get("downloaded_bytes") or 0
+        total = d.get("total_bytes") or d.get("total_bytes_estimate")
+        size = total or downloaded
+        with self._lock:
+            key = (job_key, d.get("filename"))
+            old_downloaded, old_size = self._files.get(key, (0, 0))
+            self._files[key] = (downloaded, size)
+            self._downloaded += downloaded - old_downloaded
+            self._transferred += max(downloaded - old_downloaded, 0)
+            self._job_totals[job_key] = self._job_totals.get(job_key, 0) + size - old_size
+
+            now = time.monotonic()
+            self._samples.append((now, self._transferred))
+            while self._samples and now - self._samples[0][0] > SPEED_WINDOW:
+                self._samples.popleft()
+
+    def add_job(self):
+        with self._lock:
+            self.total_jobs += 1
+            return self.total_jobs
+
+    def open_expansion(self):
+        with self._lock:
+            self.expanding += 1
+
+    def close_expansion(self):
+        with self._lock:
+            self.expanding -= 1
+
+    def finish(self, job_key, ok):
+        with self._lock:
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+                self._drop(job_key)
+
+    def cancel(self, job_key):
+        with self._lock:
+            self.cancelled += 1
+            self._drop(job_key)
+
+    # Takes a job that will not complete out of the totals, both its size
+    # and the bytes it got so far, so the percentage stays within 100.
+    # The speed keeps counting them: they were transferred all the same.
+    def _drop(self, job_key):
+        self._job_totals.pop(job_key, None)
+        for key in [key for key in self._files if key[0] == job_key]:
+            downloaded, _ = self._files.pop(key)
+            self._downloaded -= downloaded
+
+    @property
+    def done(self):
+        finished = self.completed + self.failed + self.cancelled
+        return not self.expanding and finished >= self.total_jobs
+
+    def summary(self):
+        with self._lock:
+            downloaded = self._downloaded
+            sized = list(self._job_totals.values())
+            unsized = self.total_jobs - self.failed - self.cancelled - len(sized)
+            average = sum(sized) / len(sized) if sized else 0
+            estimated_total = sum(sized) + average * max(unsized, 0)
+
+            speed = 0
+            if len(self._samples) > 1:
+                (t0, b0), (t1, b1) = self._samples[0], self._samples[-1]
+                if t1 > t0:
+                    speed = (b1 - b0) / (t1 - t0)
+
+            downloaded = min(downloaded, estimated_total) if estimated_total else downloaded
+            remaining = max(estimated_total - downloaded, 0)
+            return {
+                "total_jobs": self.total_jobs,
+                "expanding": bool(self.expanding),
+                "done": self.done,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "downloaded_bytes": downloaded,
+                "total_bytes": estimated_total,
+                "speed": speed,
+                "eta": remaining / speed if speed and not self.done else None,
+                "elapsed": time.monotonic() - self.started_at,
+            }
@@ -1,35 +1,403 @@
+import os
 import threading
-from models.downloader import YouTubeDownloader
+import time
+
+from controllers.batch import BatchProgress
+from controllers.scheduler import (
+    CANCELLED, PAUSED, QUEUED, RUNNING, JobScheduler, PRIORITY_HIGH,
+    PRIORITY_LOW, PRIORITY_NORMAL
+)
+from models.bandwidth import BandwidthGovernor
+from models.downloader import YouTubeDownloader, discard_partial
+from models.journal import JobJournal
+from models.metrics import DownloadMetrics
+from utils.constants import (
+    BANDWIDTH_LIMIT, BANDWIDTH_SCHEDULE, EXPANSION_QUEUE_LIMIT,
+    MAX_CONCURRENT_DOWNLOADS, MAX_CONCURRENT_EXPANSIONS, MAX_CONCURRENT_FETCHES,
+    MAX_JOBS_PER_HOST, METRICS_PATH
+)
+from utils.cancel import JobStopped
+from utils.urls import is_playlist_url
 
 
 class AppController:
-    def __init__(self, view):
+    def __init__(self, view, max_downloads=MAX_CONCURRENT_DOWNLOADS,
+                 max_fetches=MAX_CONCURRENT_FETCHES,
+                 max_expansions=MAX_CONCURRENT_EXPANSIONS,
+                 per_host_limit=MAX_JOBS_PER_HOST):
         self.view = view
-        self.model = YouTubeDownloader(self.view.progress_hook)
+        self.model = YouTubeDownloader(
+            self.view.progress_hook,
+            metrics=DownloadMetrics(METRICS_PATH),
+            bandwidth=BandwidthGovernor.from_text(BANDWIDTH_LIMIT, BANDWIDTH_SCHEDULE),
+        )
+        self.journal = JobJournal()
+        self.scheduler = JobScheduler(
+            {"download": max_downloads, "fetch": max_fetches, "expand": max_expansions},
+            per_host_limit=per_host_limit,
+        )
+        self.scheduler.subscribe(self._on_job_changed)
+        self._prefetch_job = None
+
+    # Loads yt-dlp and builds the first pooled YoutubeDL in the background,
+    # so the first fetch does not pay for it. Call once the window is up.
+    def warm_up(self):
+        threading.Thread(target=self.model.warm, daemon=True).start()
+
+    # Called when the window is closed. The journal is closed first, so
+    # jobs cut short here, including files whose post-processing is
+    # abandoned, stay recorded as interrupted and are resumed next time.
+    def close(self):
+        self.journal.close()
+        self.model.close(terminate=True)
+        self.view.close()
+
+    # Requeues the jobs that were queued or running when the app last
+    # stopped. Downloads continue from the .part files they left behind.
+    def resume_jobs(self):
+        jobs = self.journal.incomplete()
+        self.journal.compact(jobs)
+        if not jobs:
+            return
+
+        videos = [job for job in jobs if job["kind"] == "video"]
+        playlists = [job for job in jobs if job["kind"] == "playlist"]
+        partial = sum(1 for job in videos if any(os.path.exists(p) for p in job["parts"]))
+        self.view.log_status(
+            f"♻️ Resuming {len(jobs)} interrupted jobs ({partial} partly downloaded)"
+        )
+
+        batch = BatchProgress()
+        for job in playlists:
+            batch.open_expansion()
+        for job in videos:
+            if self.model.already_downloaded(job["url"], job["options"]):
+                self.journal.finished(job["job"])
+                continue
+            self._queue_batch_download(
+                batch, job["url"], job["options"], PRIORITY_NORMAL, job["job"]
+            )
+        # Entries of a resumed playlist that are already back in the queue
+        # must not be queued a second time.
+        resumed = {job["url"] for job in videos}
+        for job in playlists:
+            self._expand(batch, job["url"], job["options"], PRIORITY_NORMAL, job["job"], resumed)
+        self.view.progress.put("batch", batch)
+
+    # Wraps a progress hook so the journal learns each .part file a job
+    # writes to. The files are also kept in `track.parts`.
+    def _track_parts(self, job_id, hook):
+        parts = set()
+
+        def track(d):
+            part = d.get("tmpfilename")
+            if part and part not in parts:
+                parts.add(part)
+                self.journal.partial(job_id, part)
+            hook(d)
+
+        track.parts = parts
+        return track
+
+    # Removes the partial files of a cancelled download, unless it asked to
+    # keep them. A job cancelled while running has had its own files removed
+    # by the model, and the parts it saw may belong to the download it was
+    # sharing; parts of a download still in flight belong to whichever job
+    # runs it now.
+    def _discard_parts(self, job, url, ydl_opts, parts):
+        if job.stop.keep_partial or job.cancelled_from not in (QUEUED, PAUSED):
+            return
+        if self.model.in_flight(url, ydl_opts):
+            return
+        discard_partial(parts)
+
+    # Also reports a job's progress to its row in the job table.
+    def _with_job_row(self, job, hook):
+        def report(d):
+            self.view.jobs.job_progress(job, d)
+            hook(d)
+
+        return report
+
+    # Tasks may carry an `on_cancel(job)` callback. It runs however the job
+    # was cancelled: while queued, paused or running.
+    def _on_job_changed(self, job):
+        self.view.progress.put("queue", self.scheduler)
+        if not getattr(job.task, "speculative", False):
+            self.view.jobs.job_changed(job)
+        if job.state == CANCELLED:
+            on_cancel = getattr(job.task, "on_cancel", None)
+            if on_cancel:
+                on_cancel(job)
+        elif job.state == PAUSED:
+            self.view.log_status(f"⏸️ Paused {job.url}")
 
-    def fetch_info(self, url):
-        def task():
+    # Running jobs stop at their next progress event or postprocessor and
+    # their slot goes to the next queued job. A cancelled download removes
+    # its partial files unless `keep_partial`; a paused one keeps them and
+    # continues from them when resumed.
+    def cancel(self, job, keep_partial=False):
+        return self.scheduler.cancel(job, keep_partial)
+
+    def pause(self, job):
+        return self.scheduler.pause(job)
+
+    def resume(self, job):
+        if not self.scheduler.resume(job):
+            return False
+        self.view.log_status(f"▶️ Resumed {job.url}")
+        return True
+
+    # The same for every download and playlist listing; each returns the
+    # number of jobs it applied to.
+    def cancel_all(self, keep_partial=False):
+        return sum(self.cancel(job, keep_partial) for job in self.scheduler.jobs())
+
+    def pause_all(self):
+        return sum(
+            self.pause(job) for job in self.scheduler.jobs()
+            if job is not self._prefetch_job
+        )
+
+    def resume_all(self):
+        return sum(self.resume(job) for job in self.scheduler.jobs())
+
+    def fetch_info(self, url, priority=PRIORITY_HIGH):
+        def task(job):
             try:
-                info = self.model.fetch_info(url)
+                info = self.model.fetch_info(url, job.stop)
+                job.stop.check()
                 self.view.root.after(0, self.view.update_video_info, info)
-                self.view.root.after(0, self.view.log_status, "✅ Info fetched")
+                self.view.log_status("✅ Info fetched")
+                return info
+            except JobStopped:
+                raise
             except Exception as e:
-                self.view.root.after(0, self.view.log_status, f"❌ {e}")
+                self.view.log_status(f"❌ {e}", "error")
+                raise
             finally:
                 self.view.root.after(0, self.view.enable_fetch)
 
-        threading.Thread(target=task, daemon=True).start()
+        # A fetch cancelled while still queued never runs its task.
+        def cancelled(job):
+            self.view.root.after(0, self.view.enable_fetch)
+
+        task.on_cancel = cancelled
+        return self.scheduler.submit("fetch", url, task, priority)
+
+    # Speculative fetch while the user is still editing the URL: it only
+    # fills the metadata cache, so a later Fetch or Download starts from
+    # cached info (or joins this fetch if it is still running). A newer
+    # prefetch replaces one that has not started yet; one for the same URL
+    # is reused unless it has already failed or been cancelled.
+    def prefetch(self, url):
+        previous = self._prefetch_job
+        if previous is not None:
+            if previous.url == url and previous.state in (QUEUED, RUNNING):
+                return previous
+            self.scheduler.cancel(previous)
+
+        def task(job):
+            return self.model.fetch_info(url)
+
+        # Not a job the user asked for; kept out of the job table.
+        task.speculative = True
+        self._prefetch_job = self.scheduler.submit("fetch", url, task, PRIORITY_NORMAL)
+        return self._prefetch_job
+
+    def download(self, url, ydl_opts, priority=PRIORITY_NORMAL):
+        if is_playlist_url(url):
+            self.view.root.after(0, self.view.enable_download)
+            return self.download_batch([url], ydl_opts, priority)
+
+        previous = self.model.already_downloaded(url, ydl_opts)
+        if previous:
+            self.view.log_status(f"⏭️ Already downloaded: {previous['output_path']}")
+            self.view.root.after(0, self.view.enable_download)
+            return None
+
+        job_id = self.journal.queued(url, ydl_opts)
+        hook = self._track_parts(job_id, self.view.progress_hook)
 
-    def download(self, url, ydl_opts):
-        def task():
+        def done(error, info):
+            self.journal.finished(job_id, error)
+            if error:
+                self.view.log_status(f"❌ {error}", "error")
+            else:
+                self.view.log_status(f"✅ Download complete ({info['__timer'].describe()})")
+
+        def task(job):
+            self.journal.running(job_id)
             try:
                 self.view.root.after(0, self.view.reset_progress)
-                info = self.model.download(url, ydl_opts)
+                info = self.model.download(
+                    url, ydl_opts, self._with_job_row(job, hook), job.stop
+                )
                 self.view.root.after(0, self.view.update_video_info, info)
-                self.view.root.after(0, self.view.log_status, "✅ Download complete")
+                if "__postprocessing" in info:
+                    self.view.log_status("⚙️ Downloaded, converting...")
+                self._when_finished(info, lambda error: done(error, info))
+                return info
+            except JobStopped:
+                raise
             except Exception as e:
-                self.view.root.after(0, self.view.log_status, f"❌ {e}")
+                self.journal.finished(job_id, e)
+                self.view.log_status(f"❌ {e}", "error")
+                raise
             finally:
                 self.view.root.after(0, self.view.enable_download)
 
-        threading.Thread(target=task, daemon=True).start()
+        def cancelled(job):
+            self.journal.finished(job_id, "cancelled")
+            self._discard_parts(job, url, ydl_opts, hook.parts)
+            self.view.log_status(f"⏹️ Cancelled {url}")
+            self.view.root.after(0, self.view.enable_download)
+
+        task.on_cancel = cancelled
+        return self.scheduler.submit("download", url, task, priority)
+
+    def download_batch(self, urls, ydl_opts, priority=PRIORITY_NORMAL):
+        playlists = [u for u in urls if is_playlist_url(u)]
+        videos = [
+            u for u in urls
+            if u not in playlists and not self.model.already_downloaded(u, ydl_opts)
+        ]
+        skipped = len(urls) - len(playlists) - len(videos)
+        if skipped:
+            self.view.log_status(f"⏭️ Skipping {skipped} already downloaded")
+
+        batch = BatchProgress()
+        self.view.root.after(0, self.view.reset_progress)
+        self.view.log_status(f"📦 Queued {len(videos)} downloads")
+
+        # Open every expansion before queueing anything, so the batch
+        # cannot look finished while playlists are still being listed.
+        for url in playlists:
+            batch.open_expansion()
+        jobs = [self._queue_batch_download(batch, url, ydl_opts, priority) for url in videos]
+        for url in playlists:
+            job_id = self.journal.queued(url, ydl_opts, kind="playlist")
+            jobs.append(self._expand(batch, url, ydl_opts, priority, job_id))
+
+        self.view.progress.put("batch", batch)
+        return jobs
+
+    # A paused listing starts over when resumed and skips the entries it
+    # had already queued.
+    def _expand(self, batch, url, ydl_opts, priority, job_id, queued=()):
+        queued = set(queued)
+
+        def task(job):
+            found = skipped = 0
+            error = None
+            self.journal.running(job_id)
+            try:
+                self.view.log_status(f"📃 Listing {url}")
+                for entry_url, title in self.model.iter_entries(url):
+                    job.stop.check()
+                    if entry_url in queued:
+                        continue
+                    if self.model.already_downloaded(entry_url, ydl_opts):
+                        skipped += 1
+                        continue
+                    self._wait_for_queue_room(job.stop)
+                    self._queue_batch_download(batch, entry_url, ydl_opts, priority)
+                    queued.add(entry_url)
+                    found += 1
+                self.view.log_status(
+                    f"📃 Listed {found + skipped} videos from {url}"
+                    + (f" ({skipped} already downloaded)" if skipped else "")
+                )
+            except JobStopped as e:
+                error = e
+                raise
+            except Exception as e:
+                error = e
+                self.view.log_status(f"❌ {url}: {e}", "error")
+                raise
+            finally:
+                # Stopped listings are closed by on_cancel, or not at all
+                # while paused.
+                if not isinstance(error, JobStopped):
+                    self.journal.finished(job_id, error)
+                    batch.close_expansion()
+                    self.view.progress.put("batch", batch)
+
+        def cancelled(job):
+            self.journal.finished(job_id, "cancelled")
+            self.view.log_status(f"⏹️ Stopped listing {url}")
+            batch.close_expansion()
+            self.view.progress.put("batch", batch)
+
+        task.on_cancel = cancelled
+        return self.scheduler.submit("expand", url, task, PRIORITY_LOW)
+
+    # Back-pressure for playlist expansion: keep at most a bounded number of
+    # downloads waiting, so huge channels do not pile up in memory. Only
+    # other listings wait behind a listing that sleeps here; they have a
+    # lane of their own.
+    def _wait_for_queue_room(self, stop):
+        while self.scheduler.queued("download") >= EXPANSION_QUEUE_LIMIT:
+            stop.check()
+            time.sleep(0.5)
+
+    def _queue_batch_download(self, batch, url, ydl_opts, priority, job_id=None):
+        index = batch.add_job()
+        job_id = job_id or self.journal.queued(url, ydl_opts)
+        return self.scheduler.submit(
+            "download", url, self._batch_task(batch, index, url, ydl_opts, job_id), priority
+        )
+
+    def _batch_task(self, batch, index, url, ydl_opts, job_id):
+        def update(d):
+            batch.update(index, d)
+            self.view.progress.put("batch", batch)
+
+        hook = self._track_parts(job_id, update)
+
+        def task(job):
+            self.journal.running(job_id)
+            label = f"[{index}/{batch.total_jobs}{'+' if batch.expanding else ''}]"
+
+            def done(error, info=None):
+                self.journal.finished(job_id, error)
+                batch.finish(index, error is None)
+                if error:
+                    self.view.log_status(f"❌ {label} {error}", "error")
+                else:
+                    self.view.log_status(
+                        f"✅ {label} {info.get('title', url)} ({info['__timer'].describe()})"
+                    )
+                self.view.progress.put("batch", batch)
+
+            try:
+                info = self.model.download(
+                    url, ydl_opts, self._with_job_row(job, hook), job.stop
+                )
+            except JobStopped:
+                raise
+            except Exception as e:
+                done(e)
+                raise
+            self._when_finished(info, lambda error: done(error, info))
+            return info
+
+        def cancelled(job):
+            self.journal.finished(job_id, "cancelled")
+            self._discard_parts(job, url, ydl_opts, hook.parts)
+            batch.cancel(index)
+            self.view.log_status(f"⏹️ [{index}/{batch.total_jobs}] Cancelled {url}")
+            self.view.progress.put("batch", batch)
+
+        task.on_cancel = cancelled
+        return task
+
+    # Calls `done(error)` once a download is completely finished: straight
+    # away, or after post-processing if the model handed the file off to
+    # that stage.
+    def _when_finished(self, info, done):
+        pending = info.get("__postprocessing")
+        if pending is None:
+            done(None)
+        else:
+            pending.add_done_callback(lambda f: done(f.exception()))
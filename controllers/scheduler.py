@@ -0,0 +1,205 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import Counter
+
+from utils.cancel import CANCEL, PAUSE, JobStopped, StopToken
+from utils.urls import host_key
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+PAUSED = "paused"
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, kind, url, task, priority=PRIORITY_NORMAL):
+        self.id = next(Job._ids)
+        self.kind = kind
+        self.url = url
+        self.host = host_key(url)
+        self.task = task
+        self.priority = priority
+        self.state = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stop = StopToken()
+        # State a cancelled job was in when the cancel took effect: QUEUED,
+        # PAUSED, or RUNNING if its task stopped itself.
+        self.cancelled_from = None
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind} {self.state} {self.url}>"
+
+
+# Runs jobs in separate lanes ("download", "fetch", ...), each with its own
+# concurrency limit. Within a lane jobs start in priority order, then in
+# submission order, and no more than `per_host_limit` jobs of a lane talk
+# to the same host at once. Listeners are called with the job on every
+# state change, from whichever thread caused it.
+#
+# Running jobs are paused and cancelled through their `stop` token: the
+# task raises JobStopped at its next check and its slot is handed to the
+# next job straight away. A paused job can be resumed; it is queued again
+# with its original priority.
+class JobScheduler:
+    def __init__(self, limits, per_host_limit=None):
+        self.limits = dict(limits)
+        self.per_host_limit = per_host_limit
+        self._pending = {kind: [] for kind in self.limits}
+        self._running = Counter()
+        self._host_running = Counter()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._jobs = {}
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def submit(self, kind, url, task, priority=PRIORITY_NORMAL):
+        job = Job(kind, url, task, priority)
+        with self._lock:
+            heapq.heappush(self._pending[kind], (priority, next(self._seq), job))
+            self._jobs[job.id] = job
+        self._notify(job)
+        self._dispatch()
+        return job
+
+    # A queued or paused job is dropped at once; a running one is asked to
+    # stop and removes its partial files unless `keep_partial`. Returns
+    # False if the job has already finished.
+    def cancel(self, job, keep_partial=False):
+        return self._stop(job, CANCEL, CANCELLED, keep_partial)
+
+    # A queued job is set aside; a running one stops at its next check and
+    # keeps its partial files. Returns False if the job is not active.
+    def pause(self, job):
+        return self._stop(job, PAUSE, PAUSED, True)
+
+    def resume(self, job):
+        with self._lock:
+            if job.state != PAUSED:
+                return False
+            job.stop.clear()
+            job.state = QUEUED
+            job.error = None
+            heapq.heappush(self._pending[job.kind], (job.priority, next(self._seq), job))
+        self._notify(job)
+        self._dispatch()
+        return True
+
+    def _stop(self, job, reason, state, keep_partial):
+        with self._lock:
+            if job.state in (QUEUED, RUNNING, PAUSED):
+                job.stop.request(reason, keep_partial)
+            if job.state == RUNNING:
+                return True
+            if job.state == QUEUED:
+                heap = self._pending[job.kind]
+                heap[:] = [entry for entry in heap if entry[2] is not job]
+                heapq.heapify(heap)
+            elif not (job.state == PAUSED and state == CANCELLED):
+                return False
+            if state == CANCELLED:
+                job.cancelled_from = job.state
+                job.finished_at = time.time()
+                self._jobs.pop(job.id, None)
+            job.state = state
+        self._notify(job)
+        return True
+
+    def set_limit(self, kind, limit):
+        with self._lock:
+            self.limits[kind] = limit
+        self._dispatch()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": sum(self._running.values()),
+                "queued": sum(len(heap) for heap in self._pending.values()),
+                "paused": sum(1 for job in self._jobs.values() if job.state == PAUSED),
+            }
+
+    # Jobs that are queued, running or paused, oldest first.
+    def jobs(self, kind=None):
+        with self._lock:
+            return [job for job in self._jobs.values() if kind in (None, job.kind)]
+
+    def queued(self, kind):
+        with self._lock:
+            return len(self._pending[kind])
+
+    def pending(self, kind):
+        with self._lock:
+            return [job for _, _, job in sorted(self._pending[kind])]
+
+    def _dispatch(self):
+        started = []
+        with self._lock:
+            for kind, heap in self._pending.items():
+                skipped = []
+                while heap and self._running[kind] < self.limits[kind]:
+                    entry = heapq.heappop(heap)
+                    job = entry[2]
+                    if self._host_full(kind, job.host):
+                        skipped.append(entry)
+                        continue
+                    self._running[kind] += 1
+                    self._host_running[kind, job.host] += 1
+                    job.state = RUNNING
+                    job.started_at = time.time()
+                    started.append(job)
+                for entry in skipped:
+                    heapq.heappush(heap, entry)
+
+        for job in started:
+            self._notify(job)
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _host_full(self, kind, host):
+        if not self.per_host_limit or not host:
+            return False
+        return self._host_running[kind, host] >= self.per_host_limit
+
+    # The final state is set together with the slot release and the removal
+    # from _jobs, so resume() never sees a paused job whose run is still
+    # winding down.
+    def _run(self, job):
+        state = FAILED
+        try:
+            job.result = job.task(job)
+            state = DONE
+        except JobStopped as e:
+            state = PAUSED if e.reason == PAUSE else CANCELLED
+        except Exception as e:
+            job.error = e
+        finally:
+            with self._lock:
+                if state == CANCELLED:
+                    job.cancelled_from = RUNNING
+                job.state = state
+                job.finished_at = time.time()
+                self._running[job.kind] -= 1
+                self._host_running[job.kind, job.host] -= 1
+                if state != PAUSED:
+                    self._jobs.pop(job.id, None)
+            self._notify(job)
+            self._dispatch()
+
+    def _notify(self, job):
+        for listener in list(self._listeners):
+            listener(job)
@@ -1,14 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import yt_dlp
 import threading
-import os
-from PIL import Image, ImageTk
-import urllib.request
-import io
 
-DOWNLOAD_DIR = "downloads"
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+from models.downloader import YouTubeDownloader
+from utils.constants import PROGRESS_REFRESH_MS
+from utils.progress import ProgressSlots
+from views.thumbnails import ThumbnailLoader
 
 
 def format_duration(seconds):
@@ -40,10 +37,25 @@ class YouTubeDownloaderApp:
 
         self.dark_mode = True
         self.thumbnail_img = None
+        self.thumbnail_url = None
+        self.thumbnails = ThumbnailLoader(self.root, (360, 202), "LANCZOS")
         self.video_info = None
+        self.progress = ProgressSlots()
+        self.downloader = YouTubeDownloader(self.progress_hook)
         
         self.create_widgets()
         self.apply_theme()
+        self.refresh_progress()
+        self.root.after_idle(self.warm_up)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
+    def warm_up(self):
+        threading.Thread(target=self.downloader.warm, daemon=True).start()
+
+    def close(self):
+        self.downloader.close(terminate=True)
+        self.thumbnails.close()
+        self.root.destroy()
 
     def toggle_theme(self):
         self.dark_mode = not self.dark_mode
@@ -391,22 +403,22 @@ class YouTubeDownloaderApp:
                                     fg="#9ca3af" if self.dark_mode else "#6b7280")
 
     def set_thumbnail(self, url=None):
+        self.thumbnail_url = url
         if not url:
             self.thumbnail_label.config(image="", text="No thumbnail", fg="#6b7280")
             return
 
-        try:
-            with urllib.request.urlopen(url) as u:
-                raw_data = u.read()
-
-            image = Image.open(io.BytesIO(raw_data))
-            image = image.resize((360, 202), Image.LANCZOS)
+        self.thumbnails.load(url, lambda photo: self.show_thumbnail(url, photo))
 
-            self.thumbnail_img = ImageTk.PhotoImage(image)
-            self.thumbnail_label.config(image=self.thumbnail_img, text="")
-
-        except Exception:
+    def show_thumbnail(self, url, photo):
+        if url != self.thumbnail_url:
+            return
+        if photo is None:
             self.thumbnail_label.config(image="", text="Failed to load thumbnail", fg="#6b7280")
+            return
+
+        self.thumbnail_img = photo
+        self.thumbnail_label.config(image=self.thumbnail_img, text="")
 
     def log_status(self, msg):
         self.status_text.config(state="normal")
@@ -425,10 +437,16 @@ class YouTubeDownloaderApp:
             except ValueError:
                 percent_float = 0.0
 
-            self.root.after(0, self.update_progress, percent_float, speed, eta)
+            self.progress.put("download", (percent_float, speed, eta))
 
         elif d["status"] == "finished":
-            self.root.after(0, self.update_progress, 100, "Complete", "0s")
+            self.progress.put("download", (100, "Complete", "0s"))
+
+    def refresh_progress(self):
+        latest = self.progress.drain().get("download")
+        if latest:
+            self.update_progress(*latest)
+        self.root.after(PROGRESS_REFRESH_MS, self.refresh_progress)
 
     def update_progress(self, percent, speed, eta):
         self.progress_var.set(percent)
@@ -454,8 +472,7 @@ class YouTubeDownloaderApp:
 
     def _fetch_info_thread(self, url):
         try:
-            with yt_dlp.YoutubeDL({"quiet": True, "skip_download": True}) as ydl:
-                info = ydl.extract_info(url, download=False)
+            info = self.downloader.fetch_info(url)
 
             self.video_info = info
             
@@ -467,7 +484,7 @@ class YouTubeDownloaderApp:
             self.root.after(0, self.likes_value.config, {"text": format_number(info.get('like_count'))})
             self.root.after(0, self.comments_value.config, {"text": format_number(info.get('comment_count'))})
             
-            self.root.after(0, self.set_thumbnail, info.get("thumbnail"))
+            self.root.after(0, self.set_thumbnail, self.thumbnails.pick(info))
             self.root.after(0, self.log_status, f"✅ Fetched: {info.get('title')}")
 
         except Exception as e:
@@ -476,6 +493,13 @@ class YouTubeDownloaderApp:
         finally:
             self.root.after(0, lambda: self.fetch_btn.config(state="normal"))
 
+    def report_postprocessed(self, info, future):
+        error = future.exception()
+        if error:
+            self.root.after(0, self.log_status, f"❌ Error: {error}")
+        else:
+            self.root.after(0, self.log_status, f"✅ Downloaded: {info.get('title')}")
+
     def start_download(self):
         url = self.url_entry.get().strip()
         if not url or url == "https://www.youtube.com/watch?v=...":
@@ -490,11 +514,7 @@ class YouTubeDownloaderApp:
         try:
             self.root.after(0, self.reset_progress)
 
-            ydl_opts = {
-                "outtmpl": f"{DOWNLOAD_DIR}/%(title)s.%(ext)s",
-                "progress_hooks": [self.progress_hook],
-                "quiet": True,
-            }
+            ydl_opts = {}
 
             if self.download_type.get() == "audio":
                 ydl_opts.update({
@@ -512,20 +532,24 @@ class YouTubeDownloaderApp:
                     "merge_output_format": "mp4",
                 })
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
+            info = self.downloader.download(url, ydl_opts)
+            pending = info.get("__postprocessing")
+            if pending is None:
                 self.root.after(0, self.log_status, f"✅ Downloaded: {info.get('title')}")
-                
-                # Keep info displayed after download
-                if not self.video_info:
-                    self.video_info = info
-                    self.root.after(0, self.video_title.config, {"text": info.get('title', 'Unknown')})
-                    self.root.after(0, self.video_channel.config, {"text": f"📺 {info.get('uploader', 'Unknown')}"})
-                    self.root.after(0, self.video_duration.config, {"text": f"⏱️ Duration: {format_duration(info.get('duration'))}"})
-                    self.root.after(0, self.views_value.config, {"text": format_number(info.get('view_count'))})
-                    self.root.after(0, self.likes_value.config, {"text": format_number(info.get('like_count'))})
-                    self.root.after(0, self.comments_value.config, {"text": format_number(info.get('comment_count'))})
-                    self.root.after(0, self.set_thumbnail, info.get("thumbnail"))
+            else:
+                self.root.after(0, self.log_status, f"⚙️ Converting: {info.get('title')}")
+                pending.add_done_callback(lambda f: self.report_postprocessed(info, f))
+            
+            # Keep info displayed after download
+            if not self.video_info:
+                self.video_info = info
+                self.root.after(0, self.video_title.config, {"text": info.get('title', 'Unknown')})
+                self.root.after(0, self.video_channel.config, {"text": f"📺 {info.get('uploader', 'Unknown')}"})
+                self.root.after(0, self.video_duration.config, {"text": f"⏱️ Duration: {format_duration(info.get('duration'))}"})
+                self.root.after(0, self.views_value.config, {"text": format_number(info.get('view_count'))})
+                self.root.after(0, self.likes_value.config, {"text": format_number(info.get('like_count'))})
+                self.root.after(0, self.comments_value.config, {"text": format_number(info.get('comment_count'))})
+                self.root.after(0, self.set_thumbnail, self.thumbnails.pick(info))
 
         except Exception as e:
             self.root.after(0, self.log_status, f"❌ Error: {e}")
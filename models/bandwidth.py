@@ -0,0 +1,125 @@
+import re
+import threading
+import time
+from datetime import datetime
+
+# A job counts towards the fair share while it has drawn bandwidth this
+# recently; jobs busy extracting or post-processing leave their share to
+# the others.
+ACTIVE_WINDOW = 2.0
+
+# Bucket depth in seconds of the job's share: how far a job may run ahead
+# of its rate after a pause.
+BURST_SECONDS = 0.5
+
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+# "500K", "2M", "1.5G" or a plain byte count, in bytes per second. Empty
+# or zero means unlimited and is returned as None.
+def parse_rate(text):
+    if not text.strip():
+        return None
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)(?:i?B)?(?:/s)?\s*", text, re.I)
+    if not match:
+        raise ValueError(f"invalid rate: {text!r}")
+    rate = float(match.group(1)) * _UNITS[match.group(2).upper()]
+    return rate or None
+
+
+# "09:00-18:00=2M,18:00-09:00=0" to (start, end, rate) windows, with the
+# times in minutes after midnight. A window may wrap around midnight.
+def parse_schedule(text):
+    windows = []
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        match = re.fullmatch(r"(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})=(.+)", part)
+        if not match:
+            raise ValueError(f"invalid schedule entry: {part!r}")
+        h1, m1, h2, m2, rate = match.groups()
+        windows.append((int(h1) * 60 + int(m1), int(h2) * 60 + int(m2), parse_rate(rate)))
+    return windows
+
+
+class _Share:
+    def __init__(self, governor):
+        self.governor = governor
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.last_used = 0.0
+        self._seen = {}
+
+    # Progress hook: charges the bytes received since the previous call and
+    # sleeps when the job is ahead of its share. Ranged downloads report
+    # from several threads, so a total lower than one already seen is late
+    # and charges nothing.
+    def on_progress(self, d):
+        if d["status"] != "downloading":
+            return
+        key = d.get("tmpfilename") or d.get("filename")
+        downloaded = d.get("downloaded_bytes") or 0
+        previous = self._seen.get(key, downloaded)
+        self._seen[key] = max(previous, downloaded)
+        if downloaded > previous:
+            self.governor.throttle(self, downloaded - previous)
+
+
+# Process-wide token bucket that every download draws from. The cap comes
+# from the first schedule window covering the current local time, or from
+# `rate` outside all windows; None means unlimited. The cap is split evenly
+# between the jobs that are currently transferring.
+class BandwidthGovernor:
+    def __init__(self, rate=None, schedule=()):
+        self.rate = rate
+        self.schedule = list(schedule)
+        self._shares = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_text(cls, limit="", schedule=""):
+        return cls(parse_rate(limit), parse_schedule(schedule))
+
+    def current_rate(self, now=None):
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        for start, end, rate in self.schedule:
+            if start <= minute < end or (end <= start and (minute >= start or minute < end)):
+                return rate
+        return self.rate
+
+    def join(self):
+        share = _Share(self)
+        with self._lock:
+            self._shares.add(share)
+        return share
+
+    def leave(self, share):
+        with self._lock:
+            self._shares.discard(share)
+
+    def throttle(self, share, received):
+        rate = self.current_rate()
+        now = time.monotonic()
+        with self._lock:
+            if not rate:
+                share.last_used = now
+                return
+            active = sum(
+                1 for s in self._shares
+                if s is share or now - s.last_used < ACTIVE_WINDOW
+            )
+            fair = rate / active
+            share.tokens = min(fair * BURST_SECONDS,
+                               share.tokens + (now - share.updated) * fair)
+            share.tokens -= received
+            share.updated = now
+            share.last_used = now
+            debt = -share.tokens
+        if debt > 0:
+            time.sleep(debt / fair)
+
+    def stats(self):
+        rate = self.current_rate()
+        now = time.monotonic()
+        with self._lock:
+            active = sum(1 for s in self._shares if now - s.last_used < ACTIVE_WINDOW)
+        return {"rate": rate, "active_jobs": active}
@@ -0,0 +1,109 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from utils.constants import METADATA_CACHE_PATH, METADATA_TTL
+
+
+# Two-level cache for extracted info dicts: a small in-memory LRU in front
+# of an SQLite table that survives restarts. Entries expire after `ttl`
+# seconds and the table is capped at `max_entries` rows, dropping the
+# least recently used ones first.
+class MetadataCache:
+    def __init__(self, path=METADATA_CACHE_PATH, ttl=METADATA_TTL,
+                 max_memory=32, max_entries=2000):
+        self.ttl = ttl
+        self.max_memory = max_memory
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS metadata ("
+            " key TEXT PRIMARY KEY,"
+            " fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " info TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed_at)"
+        )
+        self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                fetched_at, info = entry
+                if now - fetched_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    return info
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT fetched_at, info FROM metadata WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            fetched_at, raw = row
+            if now - fetched_at >= self.ttl:
+                self._db.execute("DELETE FROM metadata WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+
+            self._db.execute(
+                "UPDATE metadata SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+            info = json.loads(raw)
+            self._remember(key, fetched_at, info)
+            return info
+
+    def put(self, key, info):
+        now = time.time()
+        raw = json.dumps(info)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO metadata (key, fetched_at, accessed_at, info)"
+                " VALUES (?, ?, ?, ?)",
+                (key, now, now, raw),
+            )
+            self._evict(now)
+            self._db.commit()
+            self._remember(key, now, info)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+            self._db.execute("DELETE FROM metadata WHERE key = ?", (key,))
+            self._db.commit()
+
+    def _remember(self, key, fetched_at, info):
+        self._memory[key] = (fetched_at, info)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now):
+        self._db.execute(
+            "DELETE FROM metadata WHERE fetched_at < ?", (now - self.ttl,)
+        )
+        self._db.execute(
+            "DELETE FROM metadata WHERE key IN ("
+            " SELECT key FROM metadata ORDER BY accessed_at DESC"
+            " LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def close(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.close()
@@ -1,28 +1,285 @@
-import yt_dlp
+import copy
+import functools
+import glob
 import os
+import time
+
+from models.bandwidth import BandwidthGovernor
+from models.cache import MetadataCache
+from models.fragments import FragmentBudget
+from models.history import DownloadHistory, format_key
+from models.metrics import DownloadMetrics, JobTimer
+from models.postprocess import PostProcessStage
+from models.ydl_pool import YDLPool
+from utils.cancel import JobStopped, StopToken
+from utils.constants import RANGED_CONNECTIONS
+from utils.singleflight import SingleFlight
+from utils.urls import cache_key
 
 DOWNLOAD_DIR = "downloads"
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+
+FETCH_OPTIONS = {
+    "quiet": True,
+    "skip_download": True
+}
+
+EXPAND_OPTIONS = {
+    "quiet": True,
+    "skip_download": True,
+    "extract_flat": "in_playlist",
+    "lazy_playlist": True,
+}
+
+# ie_key of flat entries that are themselves playlists (e.g. channel tabs).
+NESTED_PLAYLIST_IES = {"YoutubeTab", "YoutubePlaylist"}
+
+
+def _create_ydl(params):
+    # models.ranged imports yt-dlp, so it is only loaded on first use.
+    from models.ranged import RangedYoutubeDL
+    return RangedYoutubeDL(params)
+
+
+# Removes what an abandoned download leaves behind for each of `paths`:
+# the file itself, yt-dlp's .ytdl fragment state and -Frag pieces, and the
+# .ranges sidecar of a ranged download.
+def discard_partial(paths):
+    for path in paths:
+        leftovers = [path, path + ".ytdl", path + ".ranges"]
+        leftovers += glob.glob(glob.escape(path) + "-Frag*")
+        for leftover in leftovers:
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
 
 
 class YouTubeDownloader:
-    def __init__(self, progress_hook):
+    def __init__(self, progress_hook, pool=None, cache=None, history=None,
+                 postprocess_stage=None, fragments=None, connections=RANGED_CONNECTIONS,
+                 metrics=None, bandwidth=None):
         self.progress_hook = progress_hook
+        self.pool = pool or YDLPool(factory=_create_ydl)
+        self.cache = cache if cache is not None else MetadataCache()
+        self.history = history if history is not None else DownloadHistory()
+        self.postprocess_stage = postprocess_stage or PostProcessStage()
+        self.fragments = fragments or FragmentBudget()
+        self.connections = connections
+        self.metrics = metrics or DownloadMetrics()
+        self.bandwidth = bandwidth or BandwidthGovernor()
+        self._fetches = SingleFlight()
+        self._downloads = SingleFlight()
 
-    def fetch_info(self, url):
-        with yt_dlp.YoutubeDL({
-            "quiet": True,
-            "skip_download": True
-        }) as ydl:
-            return ydl.extract_info(url, download=False)
+    # Concurrent fetches of the same video share one extraction. A running
+    # extraction cannot be interrupted; `stop` only releases a caller that
+    # is waiting on someone else's.
+    def fetch_info(self, url, stop=None):
+        key = cache_key(url)
+        info = self.cache.get(key)
+        if info is not None:
+            return info
+        return self._fetches.run(key, lambda hook: self._extract(url, key), stop=stop)
+
+    def _extract(self, url, key):
+        with self.pool.lease(FETCH_OPTIONS) as ydl:
+            info = ydl.sanitize_info(ydl.extract_info(url, download=False), True)
+
+        self._remember(key, info)
+        return info
+
+    # Yields (url, title) for every video behind a playlist or channel URL
+    # as soon as it is discovered. Entries are resolved page by page without
+    # processing, so neither the full list nor the per-video info dicts are
+    # ever held in memory at once.
+    def iter_entries(self, url, depth=2):
+        with self.pool.lease(EXPAND_OPTIONS) as ydl:
+            result = ydl.extract_info(url, download=False, process=False)
+            if result.get("_type", "video") == "video":
+                yield url, result.get("title")
+                return
+
+            for entry in result.get("entries") or ():
+                if not entry:
+                    continue
+                entry_url = entry.get("url") or entry.get("webpage_url")
+                if not entry_url:
+                    continue
+                if entry.get("ie_key") in NESTED_PLAYLIST_IES or entry.get("_type") == "playlist":
+                    if depth > 0:
+                        yield from self.iter_entries(entry_url, depth - 1)
+                    continue
+                yield entry_url, entry.get("title")
+
+    def warm(self):
+        self.pool.warm(FETCH_OPTIONS)
+
+    def already_downloaded(self, url, options):
+        return self.history.lookup(cache_key(url), format_key(options))
 
-    def download(self, url, options):
+    # Post-processors in `options` do not run on the calling thread. Once
+    # the transfer is done the file is handed to the post-processing stage
+    # and the returned info carries a Future under "__postprocessing" that
+    # resolves to the final info dict. The job's JobTimer is attached under
+    # "__timer" and is complete once the download has fully finished.
+    #
+    # Concurrent downloads of the same video in the same format share one
+    # transfer: later callers get the first caller's result, and their
+    # progress hooks receive its progress from then on.
+    #
+    # `stop` is a StopToken checked on every progress event, before each
+    # postprocessor and between the steps of the job; once it is set the
+    # download raises JobStopped. Files it had started are removed unless
+    # the token asks to keep them.
+    def download(self, url, options, progress_hook=None, stop=None):
+        if stop is None:
+            stop = StopToken()
+        return self._downloads.run(
+            (cache_key(url), format_key(options)),
+            lambda hook: self._download(url, options, hook, stop),
+            progress_hook or self.progress_hook,
+            stop,
+        )
+
+    # True while a download of `url` in these options is running; its
+    # partial files belong to the job running it.
+    def in_flight(self, url, options):
+        return self._downloads.in_flight((cache_key(url), format_key(options)))
+
+    def _download(self, url, options, progress_hook, stop):
+        started_at = time.time()
+        postprocessors = options.get("postprocessors")
         ydl_opts = {
             "outtmpl": f"{DOWNLOAD_DIR}/%(title).200s.%(ext)s",
-            "progress_hooks": [self.progress_hook],
             "quiet": True,
-            **options
+            "noprogress": True,
+            "ranged_connections": self.connections,
+            **{k: v for k, v in options.items() if k != "postprocessors"}
         }
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            return ydl.extract_info(url, download=True)
+        key = cache_key(url)
+        info = self.cache.get(key)
+        if info is None:
+            # A fetch for this video may be under way; its result will do.
+            info = self._fetches.wait(key, stop)
+            if info is not None and info.get("_type", "video") != "video":
+                info = None
+        grant = self.fragments.grant(url)
+        timer = JobTimer(url)
+        share = self.bandwidth.join()
+        # Only files this job has written to, never ones that already existed.
+        started = set()
+
+        def hook(d):
+            if d["status"] == "downloading":
+                started.update(filter(None, (d.get("tmpfilename"), d.get("filename"))))
+            stop.check()
+            grant.on_progress(d)
+            timer.on_progress(d)
+            share.on_progress(d)
+            if progress_hook:
+                progress_hook(d)
+
+        def postprocessor_hook(d):
+            if d["status"] == "started":
+                stop.check()
+            timer.on_postprocessor(d)
+
+        try:
+            with self.pool.lease(ydl_opts, hook, logger=grant,
+                                 postprocessor_hook=postprocessor_hook) as ydl:
+                # Pooled instances share their params with the downloaders
+                # they create, so this only applies to the current lease.
+                ydl.params["fragment_grant"] = grant
+                try:
+                    result = self._process(ydl, url, key, info, timer, stop)
+                finally:
+                    ydl.params.pop("fragment_grant", None)
+            stop.check()
+        except Exception as e:
+            timer.retries = grant.retries
+            self._finish(timer, e)
+            if isinstance(e, JobStopped) and not stop.keep_partial:
+                discard_partial(started)
+            raise
+        finally:
+            self.fragments.release(grant)
+            self.bandwidth.leave(share)
+        timer.retries = grant.retries
+        result["__timer"] = timer
+
+        downloads = result.get("requested_downloads")
+        if postprocessors and downloads:
+            # Entries in requested_downloads may only hold the keys that
+            # differ from the top-level info, so hand over the merged view.
+            merged = {**result, **downloads[-1]}
+            merged.pop("requested_downloads", None)
+            timer.start("postprocess")
+            future = self.postprocess_stage.submit(merged, postprocessors)
+            future.add_done_callback(functools.partial(
+                self._on_postprocessed, key, options, result, started_at
+            ))
+            result["__postprocessing"] = future
+        else:
+            self._record(key, options, result, started_at)
+            self._finish(timer)
+        return result
+
+    def _process(self, ydl, url, key, info, timer, stop):
+        from yt_dlp.utils import DownloadError
+
+        if info is not None:
+            try:
+                stop.check()
+                # Same path as yt-dlp's --load-info-json: format selection
+                # and download run on the cached dict, no re-extraction.
+                timer.start("select")
+                return ydl.process_ie_result(copy.deepcopy(info), download=True)
+            except DownloadError:
+                # Most likely the signed stream URLs have expired.
+                self.cache.invalidate(key)
+
+        # extract_info(download=True) in two steps, so extraction and format
+        # selection can be timed separately.
+        timer.start("extract")
+        result = ydl.extract_info(url, download=False, process=False)
+        timer.end("extract")
+        stop.check()
+        timer.start("select")
+        result = ydl.process_ie_result(result, download=True)
+        self._remember(key, ydl.sanitize_info(result, True))
+        return result
+
+    def _finish(self, timer, error=None):
+        timer.finish(error)
+        self.metrics.observe_job(timer)
+
+    def _remember(self, key, info):
+        if info.get("_type", "video") == "video":
+            self.cache.put(key, info)
+
+    def _on_postprocessed(self, key, options, info, started_at, future):
+        timer = info["__timer"]
+        timer.end("postprocess")
+        error = future.exception()
+        if error is None:
+            timer.postprocessors = future.result().get("postprocessor_seconds", {})
+            self._record(key, options, info, started_at, future.result()["filepath"])
+        self._finish(timer, error)
+
+    def _record(self, key, options, info, started_at, filepath=None):
+        if info.get("_type", "video") != "video":
+            return
+        downloads = info.get("requested_downloads") or [{}]
+        self.history.record(
+            key, format_key(options), info.get("title"),
+            filepath or downloads[-1].get("filepath") or info.get("filepath"),
+            started_at,
+        )
+
+    # `terminate` also abandons files that are being post-processed; see
+    # PostProcessStage.close().
+    def close(self, terminate=False):
+        self.postprocess_stage.close(terminate)
+        self.pool.close()
+        self.cache.close()
+        self.history.close()
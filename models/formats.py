@@ -0,0 +1,104 @@
+from collections import namedtuple
+
+from utils.formatters import format_bytes
+
+FormatEntry = namedtuple(
+    "FormatEntry",
+    "format_id ext protocol height fps vcodec acodec tbr abr size",
+)
+
+# Lower is better. Plain HTTPS downloads start fastest and can be fetched
+# over several connections; manifests come last.
+PROTOCOL_RANK = {"https": 0, "http": 0, "http_dash_segments": 1, "m3u8_native": 2, "m3u8": 2}
+
+# Audio codec that muxes most cleanly with each video codec.
+AUDIO_FOR_VIDEO = {"avc1": "mp4a", "av01": "mp4a", "vp9": "opus", "vp09": "opus"}
+
+# `format` names exact format IDs of the indexed video; `fallback` is the
+# equivalent expression for any other video.
+Choice = namedtuple("Choice", "label format size fallback height")
+
+
+def _codec(codec):
+    if not codec or codec == "none":
+        return None
+    return codec.split(".")[0]
+
+
+def _entry(f, duration):
+    size = f.get("filesize") or f.get("filesize_approx")
+    if not size and f.get("tbr") and duration:
+        size = f["tbr"] * 1000 / 8 * duration
+    return FormatEntry(
+        f["format_id"], f.get("ext"), f.get("protocol") or "https",
+        f.get("height"), f.get("fps"), _codec(f.get("vcodec")), _codec(f.get("acodec")),
+        f.get("tbr") or 0, f.get("abr") or 0, size,
+    )
+
+
+# Index over the `formats` of a fetched info dict, by height, codec,
+# bitrate and protocol. It turns the cached metadata into concrete choices
+# with estimated sizes, each naming exact format IDs, so yt-dlp does not
+# have to re-decide the format when the download starts.
+class FormatIndex:
+    def __init__(self, info):
+        self.video_id = info.get("id")
+        duration = info.get("duration")
+        entries = [
+            _entry(f, duration) for f in info.get("formats") or ()
+            if f.get("format_id")
+        ]
+        self.video = sorted(
+            (e for e in entries if e.vcodec and e.height),
+            key=lambda e: (-e.height, -(e.fps or 0), PROTOCOL_RANK.get(e.protocol, 3), -e.tbr),
+        )
+        self.audio = sorted(
+            (e for e in entries if e.acodec and not e.vcodec),
+            key=lambda e: (PROTOCOL_RANK.get(e.protocol, 3) > 1, -(e.abr or e.tbr)),
+        )
+
+    def best_audio(self, vcodec=None):
+        preferred = AUDIO_FOR_VIDEO.get(vcodec)
+        for e in self.audio:
+            if e.acodec == preferred:
+                return e
+        return self.audio[0] if self.audio else None
+
+    def heights(self):
+        return sorted({e.height for e in self.video}, reverse=True)
+
+    # Best stream at each height, paired with the best audio-only stream in
+    # a matching codec when the video stream has no audio of its own.
+    def video_choices(self):
+        choices = []
+        for height in self.heights():
+            video = next(e for e in self.video if e.height == height)
+            audio = self.best_audio(video.vcodec)
+            if video.acodec or audio is None:
+                spec, size = video.format_id, video.size
+            else:
+                spec = f"{video.format_id}+{audio.format_id}"
+                size = video.size + audio.size if video.size and audio.size else None
+            label = f"{height}p"
+            if video.fps and video.fps > 30:
+                label += f"{video.fps:.0f}"
+            label += f" · {video.vcodec}"
+            if size:
+                label += f" · ~{format_bytes(size)}"
+            choices.append(Choice(
+                label, spec, size, f"bestvideo[height<={height}]+bestaudio/best", height
+            ))
+        return choices
+
+    def audio_choices(self):
+        choices = []
+        for e in self.audio:
+            label = f"{e.abr or e.tbr:.0f} kbps · {e.acodec}"
+            if e.size:
+                label += f" · ~{format_bytes(e.size)}"
+            if label not in (c.label for c in choices):
+                choices.append(Choice(label, e.format_id, e.size, "bestaudio/best", None))
+        return choices
+
+    def choices(self, download_type):
+        return self.audio_choices() if download_type == "audio" else self.video_choices()
@@ -0,0 +1,139 @@
+import threading
+import time
+
+from utils.constants import FRAGMENT_BUDGET, FRAGMENTS_MAX, FRAGMENTS_START
+from utils.urls import host_key
+
+# A new level has to beat the best throughput seen so far by this factor
+# before the ramp continues.
+RAMP_GAIN = 1.10
+
+# Transfers shorter than this say too little about throughput to tune on.
+MIN_SAMPLE_SECONDS = 2.0
+
+
+# One download's share of the fragment budget. Nothing is reserved until
+# the job starts its first fragmented format (reserve()); progressive and
+# ranged downloads never touch the budget. Throughput is measured over the
+# fragment bytes of every file of the job, each counted from its own first
+# progress event, up to the last one.
+class FragmentGrant:
+    def __init__(self, budget, host):
+        self.budget = budget
+        self.host = host
+        self.fragments = None
+        # True when the shared budget, not the host's level, set the size.
+        self.limited = False
+        self.first_at = None
+        self.last_at = None
+        self._files = {}
+        self.retries = 0
+        self.errors = 0
+
+    def reserve(self):
+        if self.fragments is None:
+            self.budget._reserve(self)
+        return self.fragments
+
+    @property
+    def fragment_bytes(self):
+        return sum(downloaded - offset for offset, downloaded in self._files.values())
+
+    def on_progress(self, d):
+        if d.get("fragment_count") is None:
+            return
+        if d["status"] == "downloading":
+            downloaded = d.get("downloaded_bytes") or 0
+            now = time.monotonic()
+            if self.first_at is None:
+                self.first_at = now
+            self.last_at = now
+            filename = d.get("filename")
+            offset = self._files.get(filename, (downloaded, 0))[0]
+            self._files[filename] = (offset, downloaded)
+        elif d["status"] == "error":
+            self.errors += 1
+
+    def throughput(self):
+        if self.first_at is None:
+            return None
+        elapsed = self.last_at - self.first_at
+        if elapsed < MIN_SAMPLE_SECONDS:
+            return None
+        return self.fragment_bytes / elapsed
+
+    # yt-dlp logger interface: retries and throttling show up as messages.
+    def debug(self, msg):
+        if "Retrying" in msg or "Got error" in msg:
+            self.retries += 1
+
+    def warning(self, msg):
+        if "throttl" in msg.lower() or "HTTP Error 429" in msg:
+            self.retries += 1
+
+    def error(self, msg):
+        self.errors += 1
+
+
+# Shares one fragment budget between all running downloads and picks each
+# job's concurrent_fragment_downloads by hill climbing per host: a level
+# that beat the best throughput so far is raised again, errors or retries
+# halve it, and a level that brought nothing falls back to the best one.
+# yt-dlp fixes the fragment concurrency when a download starts, so every
+# job is one step of the climb.
+class FragmentBudget:
+    def __init__(self, total=FRAGMENT_BUDGET, start=FRAGMENTS_START, maximum=FRAGMENTS_MAX):
+        self.total = total
+        self.start = start
+        self.maximum = maximum
+        self._in_use = 0
+        self._active = 0
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    # A grant for one download of `url`; see FragmentGrant.reserve().
+    def grant(self, url):
+        return FragmentGrant(self, host_key(url))
+
+    def _reserve(self, grant):
+        with self._lock:
+            level = self._state(grant.host)["level"]
+            share = max(1, self.total // (self._active + 1))
+            grant.fragments = max(1, min(level, share, self.total - self._in_use))
+            grant.limited = grant.fragments < level
+            self._active += 1
+            self._in_use += grant.fragments
+
+    def release(self, grant):
+        if grant.fragments is None:
+            return
+        throughput = grant.throughput()
+        with self._lock:
+            self._active -= 1
+            self._in_use -= grant.fragments
+            state = self._state(grant.host)
+            if grant.retries or grant.errors:
+                state["level"] = max(1, grant.fragments // 2)
+                state["best_level"] = min(state["best_level"], state["level"])
+                state["best"] = None
+            elif throughput is None or grant.limited:
+                return
+            elif state["best"] is None or throughput > state["best"] * RAMP_GAIN:
+                state["best"] = throughput
+                state["best_level"] = grant.fragments
+                state["level"] = min(self.maximum, grant.fragments + max(1, grant.fragments // 2))
+            else:
+                # No real gain at this level; settle on the best one and let
+                # its next measurement become the new baseline.
+                state["level"] = state["best_level"]
+                if grant.fragments == state["best_level"]:
+                    state["best"] = throughput
+
+    def levels(self):
+        with self._lock:
+            return {host: state["level"] for host, state in self._hosts.items()}
+
+    def _state(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = {"level": self.start, "best": None, "best_level": self.start}
+        return self._hosts[host]
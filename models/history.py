@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import threading
+import time
+
+from utils.constants import HISTORY_PATH
+
+COLUMNS = (
+    "video_key", "format", "title", "output_path", "size_bytes",
+    "started_at", "finished_at", "elapsed",
+)
+
+
+def format_key(options):
+    parts = [options.get("format") or "", options.get("merge_output_format") or ""]
+    for pp in options.get("postprocessors", []):
+        parts.append(pp["key"] + (f":{pp['preferredcodec']}" if "preferredcodec" in pp else ""))
+    return "|".join(parts)
+
+
+# Persistent index of completed downloads, keyed by (video, format). The
+# keys are also held in a set so the "already downloaded?" check made
+# before every job never touches the database.
+class DownloadHistory:
+    def __init__(self, path=HISTORY_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS downloads ("
+            " video_key TEXT NOT NULL,"
+            " format TEXT NOT NULL,"
+            " title TEXT,"
+            " output_path TEXT,"
+            " size_bytes INTEGER,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " elapsed REAL,"
+            " PRIMARY KEY (video_key, format))"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS downloads_finished ON downloads (finished_at)"
+        )
+        self._db.commit()
+        self._keys = set(self._db.execute("SELECT video_key, format FROM downloads"))
+
+    def lookup(self, video_key, fmt):
+        if (video_key, fmt) not in self._keys:
+            return None
+
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM downloads"
+                " WHERE video_key = ? AND format = ?",
+                (video_key, fmt),
+            ).fetchone()
+        if row is None:
+            return None
+
+        record = dict(zip(COLUMNS, row))
+        if not record["output_path"] or not os.path.exists(record["output_path"]):
+            # The file was moved or deleted, so it is fair game again.
+            self.forget(video_key, fmt)
+            return None
+        return record
+
+    def record(self, video_key, fmt, title, output_path, started_at, finished_at=None):
+        finished_at = finished_at or time.time()
+        try:
+            size = os.path.getsize(output_path)
+        except (OSError, TypeError):
+            size = None
+
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO downloads ({', '.join(COLUMNS)})"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (video_key, fmt, title, output_path, size,
+                 started_at, finished_at, finished_at - started_at),
+            )
+            self._db.commit()
+            self._keys.add((video_key, fmt))
+
+    def forget(self, video_key, fmt):
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM downloads WHERE video_key = ? AND format = ?",
+                (video_key, fmt),
+            )
+            self._db.commit()
+            self._keys.discard((video_key, fmt))
+
+    def recent(self, limit=50):
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM downloads"
+                " ORDER BY finished_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def totals(self, since=0):
+        with self._lock:
+            count, size, elapsed = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0), COALESCE(SUM(elapsed), 0)"
+                " FROM downloads WHERE finished_at >= ?",
+                (since,),
+            ).fetchone()
+        return {
+            "downloads": count,
+            "size_bytes": size,
+            "elapsed": elapsed,
+            "average_speed": size / elapsed if elapsed else None,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
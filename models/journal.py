@@ -0,0 +1,134 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+from utils.constants import JOURNAL_PATH
+
+QUEUED = "queued"
+RUNNING = "running"
+PARTIAL = "partial"
+DONE = "done"
+FAILED = "failed"
+
+
+# Append-only record of download jobs, one JSON object per line. Records
+# are written by a background thread, which fsyncs once for every batch it
+# drains, so callers (the Tk thread among them) never wait on the disk and
+# queueing N downloads costs a handful of fsyncs, not N. After a crash the
+# file still says which jobs were queued or running and where their .part
+# files were, give or take the last few milliseconds. A torn last line is
+# ignored on replay.
+class JobJournal:
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        self._closed = False
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def queued(self, url, options, kind="video"):
+        job_id = uuid.uuid4().hex
+        self._append({"job": job_id, "state": QUEUED, "kind": kind,
+                      "url": url, "options": options})
+        return job_id
+
+    def running(self, job_id):
+        self._append({"job": job_id, "state": RUNNING})
+
+    def partial(self, job_id, part_path):
+        self._append({"job": job_id, "state": PARTIAL, "path": os.path.abspath(part_path)})
+
+    def finished(self, job_id, error=None):
+        if error is None:
+            self._append({"job": job_id, "state": DONE})
+        else:
+            self._append({"job": job_id, "state": FAILED, "error": str(error)})
+
+    # Jobs that were queued or running when the journal was last written,
+    # in the order they were queued, with the .part files they had started.
+    def incomplete(self):
+        jobs = {}
+        self._queue.join()
+        with self._lock, open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                job_id, state = record.get("job"), record.get("state")
+                if state == QUEUED:
+                    jobs[job_id] = {
+                        "job": job_id, "kind": record.get("kind", "video"),
+                        "url": record["url"], "options": record["options"],
+                        "state": QUEUED, "parts": [],
+                    }
+                elif job_id not in jobs:
+                    continue
+                elif state == RUNNING:
+                    jobs[job_id]["state"] = RUNNING
+                elif state == PARTIAL:
+                    jobs[job_id]["parts"].append(record["path"])
+                elif state in (DONE, FAILED):
+                    del jobs[job_id]
+        return list(jobs.values())
+
+    # Rewrites the journal so that it holds only the given jobs, which keeps
+    # it from growing across sessions.
+    def compact(self, jobs):
+        tmp_path = self.path + ".tmp"
+        self._queue.join()
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for job in jobs:
+                    f.write(self._line({"job": job["job"], "state": QUEUED, "kind": job["kind"],
+                                        "url": job["url"], "options": job["options"]}))
+                    for path in job["parts"]:
+                        f.write(self._line({"job": job["job"], "state": PARTIAL, "path": path}))
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    # Writes out what is still queued and closes the file.
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=2)
+
+    def _line(self, record):
+        return json.dumps({**record, "time": time.time()}, ensure_ascii=False) + "\n"
+
+    # Records that arrive after close(), from jobs still winding down, are
+    # dropped: the journal keeps describing those jobs as interrupted.
+    def _append(self, record):
+        if not self._closed:
+            self._queue.put(self._line(record))
+
+    def _run(self):
+        while True:
+            lines = [self._queue.get()]
+            while lines[-1] is not None:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self._lock:
+                self._file.writelines(line for line in lines if line is not None)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                if lines[-1] is None:
+                    self._file.close()
+            for _ in lines:
+                self._queue.task_done()
+            if lines[-1] is None:
+                return
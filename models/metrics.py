@@ -0,0 +1,127 @@
+import time
+
+from utils.cancel import JobStopped
+from utils.formatters import format_bytes, format_speed
+from utils.metrics import MetricsRegistry
+
+PHASES = ("extract", "select", "transfer", "merge", "postprocess")
+
+BYTE_BUCKETS = tuple(2 ** n * 1024 * 1024 for n in range(0, 14))
+SPEED_BUCKETS = tuple(2 ** n * 128 * 1024 for n in range(0, 12))
+
+
+# Timestamps the phases of one download:
+#   extract      running the extractor (skipped when the info was cached)
+#   select       format selection and everything up to the first byte
+#   transfer     first progress event to the last finished file
+#   merge        yt-dlp's in-process postprocessors (merger, fixups)
+#   postprocess  handing the file to the post-processing stage until done
+class JobTimer:
+    def __init__(self, url):
+        self.url = url
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.retries = 0
+        self.error = None
+        self.postprocessors = {}
+        self._starts = {}
+        self._ends = {}
+        self._files = {}
+
+    def start(self, phase):
+        self._starts[phase] = time.monotonic()
+        self._ends.pop(phase, None)
+
+    def end(self, phase):
+        if phase in self._starts:
+            self._ends[phase] = time.monotonic()
+
+    def on_progress(self, d):
+        if "select" in self._starts and "select" not in self._ends:
+            self.end("select")
+        if "transfer" not in self._starts:
+            self.start("transfer")
+        self._files[d.get("filename")] = (
+            d.get("downloaded_bytes") or d.get("total_bytes") or 0
+        )
+        if d["status"] == "finished":
+            self.end("transfer")
+
+    def on_postprocessor(self, d):
+        if d["status"] == "started" and "merge" not in self._starts:
+            self.start("merge")
+        elif d["status"] == "finished":
+            self.end("merge")
+
+    def finish(self, error=None):
+        self.finished_at = time.monotonic()
+        self.error = error
+
+    @property
+    def bytes(self):
+        return sum(self._files.values())
+
+    def durations(self):
+        durations = {
+            phase: self._ends[phase] - self._starts[phase]
+            for phase in PHASES if phase in self._ends
+        }
+        if self.finished_at is not None:
+            durations["total"] = self.finished_at - self.started_at
+        return durations
+
+    def throughput(self):
+        transfer = self.durations().get("transfer")
+        return self.bytes / transfer if transfer else None
+
+    def describe(self):
+        durations = self.durations()
+        parts = [
+            f"{phase} {durations[phase]:.1f}s"
+            for phase in PHASES if durations.get(phase, 0) >= 0.05
+        ]
+        text = f"{format_bytes(self.bytes)} in {durations.get('total', 0):.1f}s"
+        if self.throughput():
+            text += f" at {format_speed(self.throughput())}"
+        if parts:
+            text += " · " + ", ".join(parts)
+        if self.retries:
+            text += f" · {self.retries} retries"
+        return text
+
+
+# Aggregates finished JobTimers into histograms and counters. When
+# `textfile` is set the registry is written there after every job (.json
+# for JSON, anything else in the Prometheus text format).
+class DownloadMetrics(MetricsRegistry):
+    def __init__(self, textfile=None):
+        super().__init__()
+        self.textfile = textfile
+        self.histogram("ytdl_job_phase_seconds", "Time spent in each phase of a download job.")
+        self.histogram("ytdl_postprocessor_seconds", "Run time of each post-processor.")
+        self.histogram("ytdl_job_bytes", "Bytes transferred per job.", BYTE_BUCKETS)
+        self.histogram("ytdl_job_throughput_bytes_per_second",
+                       "Average transfer rate per job.", SPEED_BUCKETS)
+        self.counter("ytdl_jobs_total", "Finished download jobs by result.")
+        self.counter("ytdl_job_retries_total", "Retried requests during downloads.")
+
+    def observe_job(self, timer):
+        for phase, seconds in timer.durations().items():
+            self.observe("ytdl_job_phase_seconds", seconds, phase=phase)
+        for name, seconds in timer.postprocessors.items():
+            self.observe("ytdl_postprocessor_seconds", seconds, postprocessor=name)
+        if timer.error is None and timer.bytes:
+            self.observe("ytdl_job_bytes", timer.bytes)
+            if timer.throughput():
+                self.observe("ytdl_job_throughput_bytes_per_second", timer.throughput())
+        if timer.error is None:
+            result = "ok"
+        elif isinstance(timer.error, JobStopped):
+            result = "stopped"
+        else:
+            result = "failed"
+        self.inc("ytdl_jobs_total", result=result)
+        if timer.retries:
+            self.inc("ytdl_job_retries_total", timer.retries)
+        if self.textfile:
+            self.write(self.textfile)
@@ -0,0 +1,22 @@
+QUALITY_FORMATS = {
+    "720p": "bestvideo[height<=720]+bestaudio/best",
+    "1080p": "bestvideo[height<=1080]+bestaudio/best",
+    "4K": "bestvideo[height<=2160]+bestaudio/best",
+}
+
+
+def download_options(download_type, quality="1080p"):
+    if download_type == "audio":
+        return {
+            "format": "bestaudio/best",
+            "writethumbnail": True,
+            "postprocessors": [
+                {"key": "FFmpegExtractAudio", "preferredcodec": "mp3"},
+                {"key": "FFmpegMetadata"},
+                {"key": "EmbedThumbnail"},
+            ],
+        }
+    return {
+        "format": QUALITY_FORMATS[quality],
+        "merge_output_format": "mp4",
+    }
@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Runs in a worker process: replays yt-dlp's post-processing step for one
+# already downloaded file and returns the updated info dict, with the run
+# time of each postprocessor under "postprocessor_seconds".
+def _run_postprocessors(info, postprocessors):
+    import yt_dlp
+
+    started, seconds = {}, {}
+
+    def timing(d):
+        name = d["postprocessor"]
+        if d["status"] == "started":
+            started[name] = time.monotonic()
+        elif d["status"] == "finished" and name in started:
+            seconds[name] = seconds.get(name, 0) + time.monotonic() - started.pop(name)
+
+    try:
+        with yt_dlp.YoutubeDL({
+            "quiet": True,
+            "noprogress": True,
+            "postprocessors": postprocessors,
+            "postprocessor_hooks": [timing],
+        }) as ydl:
+            info = ydl.post_process(info["filepath"], info)
+            return ydl.sanitize_info(info, True) | {
+                "filepath": info.get("filepath"),
+                "postprocessor_seconds": seconds,
+            }
+    except Exception as e:
+        # yt-dlp's exceptions do not always survive pickling.
+        raise RuntimeError(str(e)) from None
+
+
+# Info dicts handed to the pool must pickle: keep yt-dlp's own keys
+# (including thumbnail file paths) but drop private "__" entries, which
+# hold postprocessor objects.
+def _portable_info(info):
+    import yt_dlp
+
+    info = yt_dlp.YoutubeDL.sanitize_info(dict(info))
+    return {k: v for k, v in info.items() if not k.startswith("__")}
+
+
+# Transcoding stage that runs separately from the network stage. Download
+# workers hand finished files to a process pool and move on to their next
+# transfer while the pool keeps the CPU cores busy encoding.
+class PostProcessStage:
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, info, postprocessors):
+        with self._lock:
+            if self._executor is None:
+                # "spawn" so workers do not inherit Tk or running threads.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            executor = self._executor
+        return executor.submit(_run_postprocessors, _portable_info(info), postprocessors)
+
+    # Cancels the files still waiting for a worker. With `terminate`, the
+    # ones being processed are abandoned too, instead of keeping the
+    # process alive until they finish; they are done again on resume.
+    def close(self, terminate=False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        if terminate:
+            for process in processes:
+                process.terminate()
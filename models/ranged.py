@@ -0,0 +1,300 @@
+import io
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import yt_dlp
+from yt_dlp.downloader import FileDownloader, HttpFD
+from yt_dlp.networking import Request, Response
+from yt_dlp.networking.exceptions import HTTPError, TransportError
+from yt_dlp.utils import DownloadError, determine_protocol
+
+from utils import http
+from utils.cancel import JobStopped
+from utils.constants import RANGED_CHUNK_SIZE, RANGED_MIN_SIZE
+
+BLOCK_SIZE = 64 * 1024
+
+# Ranges are counted in bytes of the file as stored, so they must not be
+# compressed in transit; HttpFD asks for the same.
+IDENTITY = {"Accept-Encoding": "identity"}
+
+# Backoff between retries of a range when no retry_sleep_functions are set.
+RETRY_SLEEP = 1.0
+RETRY_SLEEP_MAX = 10.0
+
+# Protocols that yt-dlp downloads fragment by fragment.
+FRAGMENTED_PROTOCOLS = {
+    "m3u8", "m3u8_native", "http_dash_segments", "http_dash_segments_generator",
+    "ism", "f4m", "mhtml",
+}
+
+# Set while a thread is inside YoutubeDL._write_thumbnails.
+_writing_thumbnails = threading.local()
+
+
+class RangeUnsupported(Exception):
+    pass
+
+
+# Downloads one file over several connections. The file is preallocated,
+# split into byte ranges, and every range is fetched with its own Range
+# request and written at its offset; a failed range is retried on its own
+# from the last byte it received. Finished ranges are listed in a
+# "<part>.ranges" file next to the .part file, so an interrupted download
+# picks up where it stopped. Servers that do not answer with 206 and a
+# total size fall back to the plain HTTP downloader.
+class RangedFD(FileDownloader):
+    def real_download(self, filename, info_dict):
+        headers = dict(info_dict.get("http_headers") or {})
+        url = info_dict["url"]
+        try:
+            size = self._probe(url, headers)
+        except RangeUnsupported:
+            return self._fallback(filename, info_dict)
+        if size < RANGED_MIN_SIZE:
+            return self._fallback(filename, info_dict)
+
+        tmpfilename = self.temp_name(filename)
+        self.report_destination(filename)
+
+        connections = max(1, self.params.get("ranged_connections") or 1)
+        chunk = (info_dict.get("downloader_options") or {}).get("http_chunk_size")
+        # At least one range per connection, none larger than the chunk size.
+        chunk = min(chunk or RANGED_CHUNK_SIZE, RANGED_CHUNK_SIZE, -(-size // connections))
+        ranges = [(start, min(start + chunk, size) - 1) for start in range(0, size, chunk)]
+
+        finished = self._load_finished(tmpfilename, size, chunk)
+        if finished:
+            ranges = [r for r in ranges if r[0] not in finished]
+            resumed = size - sum(end - start + 1 for start, end in ranges)
+            self.report_resuming_byte(resumed)
+        else:
+            resumed = 0
+            with open(tmpfilename, "wb") as f:
+                f.truncate(size)
+
+        state = {
+            "filename": filename,
+            "tmpfilename": tmpfilename,
+            "total_bytes": size,
+            "downloaded_bytes": resumed,
+            "resumed_bytes": resumed,
+            "chunk": chunk,
+            "finished": set(finished),
+            "started": time.time(),
+            "lock": threading.Lock(),
+            # Set once a range has failed or the job was stopped; the other
+            # connections give up at their next block.
+            "abort": threading.Event(),
+        }
+        with ThreadPoolExecutor(max_workers=min(connections, len(ranges))) as pool:
+            futures = [
+                pool.submit(self._fetch_range, url, headers, r, state, info_dict)
+                for r in ranges
+            ]
+            try:
+                for future in as_completed(futures):
+                    if not future.result():
+                        return False
+            finally:
+                if not all(future.done() for future in futures):
+                    state["abort"].set()
+                    for future in futures:
+                        future.cancel()
+
+        self.try_rename(tmpfilename, filename)
+        self.try_remove(tmpfilename + ".ranges")
+        self._hook_progress({
+            "status": "finished",
+            "filename": filename,
+            "downloaded_bytes": size,
+            "total_bytes": size,
+            "elapsed": time.time() - state["started"],
+        }, info_dict)
+        return True
+
+    def _probe(self, url, headers):
+        try:
+            request = Request(url, headers={**IDENTITY, **headers, "Range": "bytes=0-0"})
+            with self.ydl.urlopen(request) as res:
+                content_range = res.headers.get("Content-Range") or ""
+                status = res.status
+        except Exception as e:
+            raise RangeUnsupported(str(e)) from e
+        match = re.fullmatch(r"bytes 0-0/(\d+)", content_range.strip())
+        if status != 206 or not match:
+            raise RangeUnsupported(content_range)
+        return int(match.group(1))
+
+    def _load_finished(self, tmpfilename, size, chunk):
+        if not self.params.get("continuedl", True):
+            return set()
+        try:
+            if os.path.getsize(tmpfilename) != size:
+                return set()
+            with open(tmpfilename + ".ranges", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        if saved.get("size") != size or saved.get("chunk") != chunk:
+            return set()
+        return set(saved.get("finished") or ())
+
+    def _save_finished(self, state):
+        path = state["tmpfilename"] + ".ranges"
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "size": state["total_bytes"],
+                "chunk": state["chunk"],
+                "finished": sorted(state["finished"]),
+            }, f)
+        os.replace(path + ".tmp", path)
+
+    def _fallback(self, filename, info_dict):
+        fd = HttpFD(self.ydl, self.params)
+        for ph in self._progress_hooks:
+            fd.add_progress_hook(ph)
+        return fd.real_download(filename, info_dict)
+
+    def _fetch_range(self, url, headers, byte_range, state, info_dict):
+        start, end = byte_range
+        position = start
+        retries = self.params.get("retries", 10)
+        count = 0
+        abort = state["abort"]
+        with open(state["tmpfilename"], "r+b") as f:
+            while position <= end:
+                if abort.is_set():
+                    return False
+                try:
+                    request = Request(url, headers={
+                        **IDENTITY, **headers, "Range": f"bytes={position}-{end}",
+                    })
+                    with self.ydl.urlopen(request) as res:
+                        if res.status != 206:
+                            raise DownloadError(f"server ignored range {position}-{end}")
+                        f.seek(position)
+                        while position <= end and not abort.is_set():
+                            block = res.read(min(BLOCK_SIZE, end - position + 1))
+                            if not block:
+                                break
+                            f.write(block)
+                            position += len(block)
+                            self._report(state, len(block), info_dict)
+                    if abort.is_set():
+                        return False
+                    if position <= end:
+                        raise DownloadError(f"connection closed at byte {position} of range {start}-{end}")
+                except JobStopped:
+                    abort.set()
+                    raise
+                except Exception as e:
+                    count += 1
+                    if count > retries:
+                        abort.set()
+                        self.report_error(f"giving up on range {start}-{end}: {e}")
+                        return False
+                    self._retry(e, count, retries)
+        with state["lock"]:
+            state["finished"].add(start)
+            self._save_finished(state)
+        return True
+
+    # report_retry() sleeps with the "http" retry_sleep_functions entry when
+    # one is set; without one, ranges back off on their own instead of
+    # retrying at once on every connection.
+    def _retry(self, error, count, retries):
+        self.report_retry(error, count, retries, fatal=False)
+        if not (self.params.get("retry_sleep_functions") or {}).get("http"):
+            time.sleep(min(RETRY_SLEEP * 2 ** (count - 1), RETRY_SLEEP_MAX))
+
+    # The snapshot is taken under the lock, the hooks run outside it: a
+    # hook may sleep (bandwidth cap), and that must not hold up the other
+    # connections. Hooks may therefore see the totals slightly out of order.
+    def _report(self, state, received, info_dict):
+        with state["lock"]:
+            state["downloaded_bytes"] += received
+            downloaded = state["downloaded_bytes"]
+        now = time.time()
+        speed = self.calc_speed(state["started"], now, downloaded - state["resumed_bytes"])
+        self._hook_progress({
+            "status": "downloading",
+            "filename": state["filename"],
+            "tmpfilename": state["tmpfilename"],
+            "downloaded_bytes": downloaded,
+            "total_bytes": state["total_bytes"],
+            "speed": speed,
+            "eta": self.calc_eta(speed, state["total_bytes"] - downloaded),
+            "elapsed": now - state["started"],
+        }, info_dict)
+
+
+def _is_fragmented(info):
+    formats = info.get("requested_formats") or [info]
+    return any(
+        f.get("fragments") or determine_protocol(f) in FRAGMENTED_PROTOCOLS
+        for f in formats
+    )
+
+
+# YoutubeDL that hands single-file HTTP(S) formats to RangedFD when the
+# "ranged_connections" parameter asks for more than one connection. Merged
+# formats reach dl() one at a time, so both halves of a DASH pair that are
+# served as plain files qualify too.
+#
+# A "fragment_grant" parameter (models.fragments.FragmentGrant) sets the
+# fragment concurrency of fragmented formats; the grant is only reserved
+# once such a format is about to be downloaded.
+#
+# Thumbnails written for embedding are fetched through the app's shared
+# keep-alive HTTP client rather than on a new connection each, unless a
+# proxy was set in the params.
+class RangedYoutubeDL(yt_dlp.YoutubeDL):
+    def _write_thumbnails(self, *args, **kwargs):
+        _writing_thumbnails.active = True
+        try:
+            return super()._write_thumbnails(*args, **kwargs)
+        finally:
+            _writing_thumbnails.active = False
+
+    def urlopen(self, req):
+        if not getattr(_writing_thumbnails, "active", False) or self.params.get("proxy"):
+            return super().urlopen(req)
+        if isinstance(req, str):
+            req = Request(req)
+        headers = {**self.params.get("http_headers", {}), **req.headers}
+        try:
+            res = http.shared_client().get(req.url, headers)
+        except http.HTTPError as e:
+            res = e.response
+            raise HTTPError(Response(io.BytesIO(res.body), res.url, res.headers, res.status)) from None
+        except (OSError, ValueError) as e:
+            raise TransportError(cause=e) from e
+        return Response(io.BytesIO(res.body), res.url, res.headers, res.status)
+
+    def dl(self, name, info, subtitle=False, test=False):
+        grant = self.params.get("fragment_grant")
+        if grant is not None and not (test or subtitle) and _is_fragmented(info):
+            self.params["concurrent_fragment_downloads"] = grant.reserve()
+
+        if (
+            test or subtitle or name == "-"
+            or (self.params.get("ranged_connections") or 1) <= 1
+            or info.get("is_live")
+            or info.get("requested_formats")
+            or determine_protocol(info) not in ("http", "https")
+        ):
+            return super().dl(name, info, subtitle, test)
+
+        fd = RangedFD(self, self.params)
+        for ph in self._progress_hooks:
+            fd.add_progress_hook(ph)
+        new_info = self._copy_infodict(info)
+        if new_info.get("http_headers") is None:
+            new_info["http_headers"] = self._calc_headers(new_info)
+        return fd.download(name, new_info, subtitle)
+
@@ -0,0 +1,136 @@
+import json
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def _options_key(options):
+    # Callables (hooks, loggers) fall back to repr(), which is stable for
+    # the lifetime of the object they describe.
+    return json.dumps(options, sort_keys=True, default=repr)
+
+
+# Installed once per YoutubeDL instance and pointed at the caller's hook
+# for the duration of a lease, so pooled instances can be shared between
+# jobs that report progress to different places.
+class _HookRelay:
+    def __init__(self):
+        self.target = None
+
+    def __call__(self, d):
+        if self.target:
+            self.target(d)
+
+
+# Same idea for yt-dlp's `logger` parameter. Warnings and errors are still
+# written to stderr as yt-dlp would do without a logger; everything is
+# also passed on to the leasing caller's logger, if it has one.
+class _LoggerRelay:
+    def __init__(self):
+        self.target = None
+
+    def debug(self, msg):
+        if self.target:
+            self.target.debug(msg)
+
+    def warning(self, msg):
+        print(f"WARNING: {msg}", file=sys.stderr)
+        if self.target:
+            self.target.warning(msg)
+
+    def error(self, msg):
+        print(msg, file=sys.stderr)
+        if self.target:
+            self.target.error(msg)
+
+
+# Keeps initialised YoutubeDL instances around, keyed by their options.
+# A YoutubeDL object is not thread safe, so each instance is handed out to
+# one thread at a time through lease() and returned afterwards. `factory`
+# builds an instance from its params and defaults to yt_dlp.YoutubeDL.
+class YDLPool:
+    def __init__(self, max_idle_per_key=4, max_keys=8, factory=None):
+        self.max_idle_per_key = max_idle_per_key
+        self.max_keys = max_keys
+        self._idle = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.factory = factory
+
+    def _create(self, options):
+        factory = self.factory
+        if factory is None:
+            # Imported here so that importing the model stays cheap; yt-dlp
+            # and its extractor registry are only loaded when first needed.
+            import yt_dlp
+            factory = yt_dlp.YoutubeDL
+
+        relay = _HookRelay()
+        pp_relay = _HookRelay()
+        logger = _LoggerRelay()
+        ydl = factory({
+            "logger": logger,
+            **options,
+            "progress_hooks": [*options.get("progress_hooks", []), relay],
+            "postprocessor_hooks": [*options.get("postprocessor_hooks", []), pp_relay],
+        })
+        return ydl, relay, pp_relay, logger
+
+    def warm(self, options, count=1):
+        key = _options_key(options)
+        for _ in range(count):
+            self._release(key, self._create(options))
+
+    @contextmanager
+    def lease(self, options, progress_hook=None, logger=None, postprocessor_hook=None):
+        key = _options_key(options)
+        entry = None
+        with self._lock:
+            bucket = self._idle.get(key)
+            if bucket:
+                entry = bucket.pop()
+                self._idle.move_to_end(key)
+
+        if entry is None:
+            entry = self._create(options)
+
+        ydl, relay, pp_relay, logger_relay = entry
+        relay.target = progress_hook
+        pp_relay.target = postprocessor_hook
+        logger_relay.target = logger
+        try:
+            yield ydl
+        finally:
+            relay.target = None
+            pp_relay.target = None
+            logger_relay.target = None
+            self._release(key, entry)
+
+    def _release(self, key, entry):
+        evicted = []
+        with self._lock:
+            if self._closed:
+                evicted.append(entry)
+            else:
+                bucket = self._idle.setdefault(key, [])
+                self._idle.move_to_end(key)
+                if len(bucket) < self.max_idle_per_key:
+                    bucket.append(entry)
+                else:
+                    evicted.append(entry)
+                while len(self._idle) > self.max_keys:
+                    _, stale = self._idle.popitem(last=False)
+                    evicted.extend(stale)
+
+        for ydl, *_ in evicted:
+            ydl.close()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            entries = [e for bucket in self._idle.values() for e in bucket]
+            self._idle.clear()
+
+        for ydl, *_ in entries:
+            ydl.close()
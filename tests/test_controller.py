@@ -0,0 +1,135 @@
+import os
+import tempfile
+import time
+import unittest
+
+from benchmarks.local_media import MediaServer, create_ydl
+from controllers.controller import AppController
+from controllers.scheduler import CANCELLED, DONE, PAUSED, RUNNING
+from models.cache import MetadataCache
+from models.downloader import DOWNLOAD_DIR, YouTubeDownloader
+from models.history import DownloadHistory
+from models.ydl_pool import YDLPool
+
+SIZE = 4 * 1024 * 1024
+OPTIONS = {"format": "file"}
+
+
+# Stands in for MainView: every call is recorded, root.after() runs its
+# callback at once.
+class _Stub:
+    def __init__(self, calls):
+        self._calls = calls
+
+    def after(self, delay, fn, *args):
+        fn(*args)
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self._calls.append(name)
+
+
+class _View(_Stub):
+    def __init__(self):
+        super().__init__([])
+        self.root = self
+        self.progress = _Stub([])
+        self.jobs = _Stub([])
+
+
+def wait_for(condition, timeout=20):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+class CancelDuplicateTest(unittest.TestCase):
+    def setUp(self):
+        cwd = os.getcwd()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+        self.server = MediaServer(size=SIZE, rate=2 * 1024 * 1024).start()
+        self.addCleanup(self.server.stop)
+        self.url = self.server.url("abc")
+        self.part = os.path.join(DOWNLOAD_DIR, "sample abc.mp4.part")
+
+        self.view = _View()
+        self.controller = AppController(self.view)
+        self.controller.model = YouTubeDownloader(
+            None,
+            pool=YDLPool(factory=create_ydl),
+            cache=MetadataCache(":memory:"),
+            history=DownloadHistory(":memory:"),
+            connections=1,
+        )
+        self.addCleanup(self.controller.close)
+
+    def download(self):
+        return self.controller.download(self.url, OPTIONS)
+
+    def test_cancelling_a_follower_keeps_the_leaders_parts(self):
+        a = self.download()
+        wait_for(lambda: os.path.exists(self.part))
+        b = self.download()
+        wait_for(lambda: b.state == RUNNING)
+        self.controller.cancel(b, keep_partial=False)
+        wait_for(lambda: b.state == CANCELLED)
+
+        self.assertTrue(os.path.exists(self.part))
+        wait_for(lambda: a.finished_at)
+        self.assertEqual(a.state, DONE, a.error)
+        self.assertEqual(os.path.getsize(a.result["requested_downloads"][0]["filepath"]), SIZE)
+
+    def test_cancelling_a_paused_job_keeps_parts_taken_over_by_a_duplicate(self):
+        a = self.download()
+        wait_for(lambda: os.path.exists(self.part))
+        self.controller.pause(a)
+        wait_for(lambda: a.state == PAUSED)
+        b = self.download()
+        wait_for(lambda: b.state == RUNNING and self.controller.model.in_flight(self.url, OPTIONS))
+        self.controller.cancel(a, keep_partial=False)
+
+        wait_for(lambda: b.finished_at)
+        self.assertEqual(b.state, DONE, b.error)
+
+    def test_cancelling_a_paused_job_removes_its_parts(self):
+        a = self.download()
+        wait_for(lambda: os.path.exists(self.part))
+        self.controller.pause(a)
+        wait_for(lambda: a.state == PAUSED)
+        self.assertTrue(os.path.exists(self.part))
+        self.controller.cancel(a, keep_partial=False)
+        self.assertFalse(os.path.exists(self.part))
+
+
+class CancelQueuedTest(unittest.TestCase):
+    def setUp(self):
+        cwd = os.getcwd()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+        self.view = _View()
+        self.controller = AppController(self.view)
+        self.addCleanup(self.controller.close)
+
+    def test_cancelled_queued_download_enables_download(self):
+        self.controller.scheduler.set_limit("download", 0)
+        job = self.controller.download("https://youtu.be/dQw4w9WgXcQ", OPTIONS)
+        self.controller.cancel(job)
+        self.assertIn("enable_download", self.view._calls)
+
+    def test_cancelled_queued_fetch_enables_fetch(self):
+        self.controller.scheduler.set_limit("fetch", 0)
+        job = self.controller.fetch_info("https://youtu.be/dQw4w9WgXcQ")
+        self.controller.cancel(job)
+        self.assertIn("enable_fetch", self.view._calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from yt_dlp.utils import DownloadError
+
+from models.ranged import RangedFD, RangedYoutubeDL
+
+SIZE = 3 * 1024 * 1024
+CHUNK = 256 * 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        payload = server.payload
+        header = self.headers.get("Range")
+        with server.lock:
+            server.requests.append((header, self.headers.get("Accept-Encoding")))
+
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", header or "")
+        if not server.honour_range or not match:
+            self._send(200, payload)
+            return
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else len(payload) - 1
+        if start in server.failing:
+            self.send_error(500)
+            return
+        self._send(206, payload[start:end + 1],
+                   [("Content-Range", f"bytes {start}-{end}/{len(payload)}")])
+
+    def _send(self, status, body, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class RangedFDTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.payload = os.urandom(SIZE)
+        self.server.honour_range = True
+        self.server.failing = set()
+        self.server.requests = []
+        self.server.lock = threading.Lock()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.filename = os.path.join(tmp.name, "media.bin")
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/media.bin"
+
+    def download(self, **params):
+        ydl = RangedYoutubeDL({
+            "quiet": True, "noprogress": True, "ranged_connections": 4,
+            "retry_sleep_functions": {"http": lambda n: 0},
+            **params,
+        })
+        self.addCleanup(ydl.close)
+        fd = RangedFD(ydl, ydl.params)
+        return fd.real_download(self.filename, {
+            "url": self.url,
+            "http_headers": {},
+            "downloader_options": {"http_chunk_size": CHUNK},
+        })
+
+    def ranges_requested(self):
+        return [header for header, _ in self.server.requests if header != "bytes=0-0"]
+
+    def read(self, path=None):
+        with open(path or self.filename, "rb") as f:
+            return f.read()
+
+    def test_reassembles_file_from_ranges(self):
+        self.assertTrue(self.download())
+        self.assertEqual(self.read(), self.server.payload)
+        self.assertEqual(len(self.ranges_requested()), SIZE // CHUNK)
+        self.assertFalse(os.path.exists(self.filename + ".part"))
+        self.assertFalse(os.path.exists(self.filename + ".part.ranges"))
+        # Ranges are counted in stored bytes, so nothing may be compressed.
+        self.assertEqual({encoding for _, encoding in self.server.requests}, {"identity"})
+
+    def test_resumes_from_finished_ranges(self):
+        part = self.filename + ".part"
+        finished = list(range(0, SIZE, CHUNK))[::2]
+        with open(part, "wb") as f:
+            f.truncate(SIZE)
+            for start in finished:
+                f.seek(start)
+                f.write(self.server.payload[start:start + CHUNK])
+        with open(part + ".ranges", "w", encoding="utf-8") as f:
+            json.dump({"size": SIZE, "chunk": CHUNK, "finished": finished}, f)
+
+        self.assertTrue(self.download())
+        self.assertEqual(self.read(), self.server.payload)
+        requested = {int(re.match(r"bytes=(\d+)-", h).group(1)) for h in self.ranges_requested()}
+        self.assertEqual(requested, set(range(0, SIZE, CHUNK)) - set(finished))
+
+    def test_falls_back_when_server_ignores_range(self):
+        self.server.honour_range = False
+        self.assertTrue(self.download())
+        self.assertEqual(self.read(), self.server.payload)
+        # The probe, then one plain download of the whole file.
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_failed_range_stops_the_others(self):
+        self.server.failing = {CHUNK}
+        with self.assertRaises(DownloadError):
+            self.download(retries=1)
+        # The failing range was tried twice; most of the others never ran.
+        self.assertLess(len(self.ranges_requested()), SIZE // CHUNK)
+
+
+if __name__ == "__main__":
+    unittest.main()
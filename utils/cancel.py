@@ -0,0 +1,43 @@
+import threading
+
+CANCEL = "cancel"
+PAUSE = "pause"
+
+
+# Raised from inside a job once it notices a stop request: from a progress
+# hook, a postprocessor hook, or a check between two steps.
+class JobStopped(Exception):
+    def __init__(self, reason):
+        super().__init__("Paused" if reason == PAUSE else "Cancelled")
+        self.reason = reason
+
+
+# Stop request shared between whoever controls a job and the code running
+# it. Stopping is cooperative: the running code calls check() at the points
+# where it can stop cleanly. A paused job keeps its partial files so it can
+# continue from them; a cancelled one removes them unless `keep_partial`.
+class StopToken:
+    def __init__(self):
+        self.reason = None
+        self.keep_partial = True
+        self._lock = threading.Lock()
+
+    def request(self, reason, keep_partial=True):
+        with self._lock:
+            # A cancel wins over a pause that has not been honoured yet.
+            if self.reason != CANCEL:
+                self.reason = reason
+                self.keep_partial = keep_partial
+
+    def clear(self):
+        with self._lock:
+            self.reason = None
+            self.keep_partial = True
+
+    @property
+    def requested(self):
+        return self.reason is not None
+
+    def check(self):
+        if self.reason is not None:
+            raise JobStopped(self.reason)
@@ -0,0 +1,65 @@
+CACHE_DIR = "cache"
+METADATA_CACHE_PATH = f"{CACHE_DIR}/metadata.sqlite3"
+
+# Signed stream URLs in an info dict stop working after a few hours, so
+# cached metadata must be refreshed well before that.
+METADATA_TTL = 60 * 60
+
+MAX_CONCURRENT_DOWNLOADS = 3
+MAX_CONCURRENT_FETCHES = 4
+MAX_JOBS_PER_HOST = 3
+
+# Playlist and channel listings run in a lane of their own, so a listing
+# that waits for room in the download queue never holds up a Fetch Info.
+MAX_CONCURRENT_EXPANSIONS = 2
+
+# Concurrent fragment downloads (DASH/HLS) shared by all running jobs, and
+# the per-job level a new host starts at and may ramp up to.
+FRAGMENT_BUDGET = 16
+FRAGMENTS_START = 4
+FRAGMENTS_MAX = 16
+
+# Single-file HTTP(S) formats are fetched as parallel byte ranges over this
+# many connections. Files smaller than RANGED_MIN_SIZE use one connection.
+RANGED_CONNECTIONS = 4
+RANGED_CHUNK_SIZE = 10 * 1024 * 1024
+RANGED_MIN_SIZE = 2 * 1024 * 1024
+
+# Aggregate download bandwidth, e.g. "4M", and optional time-of-day caps
+# such as "09:00-18:00=2M,18:00-09:00=0". Empty or 0 means unlimited.
+BANDWIDTH_LIMIT = ""
+BANDWIDTH_SCHEDULE = ""
+
+THUMBNAIL_CACHE_DIR = f"{CACHE_DIR}/thumbnails"
+
+# Cached thumbnails older than this are revalidated with a conditional GET
+# (in the background; the cached copy is shown meanwhile).
+THUMBNAIL_REVALIDATE_AFTER = 24 * 60 * 60
+
+# Shared keep-alive client for thumbnails and other non-media requests.
+HTTP_TIMEOUT = 10
+HTTP_MAX_PER_HOST = 4
+HTTP_IDLE_TIMEOUT = 60
+HTTP_USER_AGENT = "Mozilla/5.0 (compatible; yt-dlp-gui)"
+
+# Quiet time after the last edit of the URL field before its metadata is
+# fetched speculatively.
+PREFETCH_DEBOUNCE_MS = 400
+
+# UI refresh period for coalesced progress updates (~15 Hz).
+PROGRESS_REFRESH_MS = 66
+
+LOG_PATH = "logs/status.jsonl"
+LOG_CAPACITY = 1000
+LOG_MAX_LINES = 500
+LOG_FLUSH_MS = 200
+
+# Prometheus textfile with per-phase download timings, rewritten after
+# every job.
+METRICS_PATH = "logs/metrics.prom"
+
+HISTORY_PATH = "data/history.sqlite3"
+JOURNAL_PATH = "data/jobs.jsonl"
+
+# Playlist expansion pauses while this many downloads are already waiting.
+EXPANSION_QUEUE_LIMIT = 50
@@ -14,3 +14,19 @@ def format_number(num):
     if num >= 1_000:
         return f"{num / 1_000:.1f}K"
     return str(num)
+
+
+def format_bytes(num):
+    if not num:
+        return "0 B"
+    for unit in ("B", "KB", "MB", "GB"):
+        if num < 1024:
+            return f"{num:.0f} {unit}" if unit == "B" else f"{num:.1f} {unit}"
+        num /= 1024
+    return f"{num:.1f} TB"
+
+
+def format_speed(bytes_per_second):
+    if not bytes_per_second:
+        return "--"
+    return f"{format_bytes(bytes_per_second)}/s"
@@ -0,0 +1,191 @@
+import http.client
+import ssl
+import threading
+import time
+import urllib.request
+from collections import namedtuple
+from urllib.parse import urljoin, urlsplit
+
+from utils.constants import (
+    HTTP_IDLE_TIMEOUT, HTTP_MAX_PER_HOST, HTTP_TIMEOUT, HTTP_USER_AGENT
+)
+
+REDIRECTS = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+
+# Errors that mean a kept-alive connection was closed by the server while
+# it sat in the pool; the request is sent again on a new connection.
+STALE_CONNECTION = (
+    http.client.RemoteDisconnected, http.client.BadStatusLine,
+    ConnectionResetError, BrokenPipeError,
+)
+
+Response = namedtuple("Response", "status headers body url")
+
+
+# Raised for 4xx and 5xx answers. Subclasses OSError so callers that
+# already handle network errors handle these too.
+class HTTPError(OSError):
+    def __init__(self, response):
+        super().__init__(f"HTTP Error {response.status} for {response.url}")
+        self.response = response
+        self.status = response.status
+
+
+# Cache validators of a response, to be passed back to get() later.
+def validators(response):
+    return {
+        key: value for key, value in (
+            ("etag", response.headers.get("ETag")),
+            ("last_modified", response.headers.get("Last-Modified")),
+        ) if value
+    }
+
+
+# Small HTTP/1.1 client for the app's own requests that are not media
+# downloads (thumbnails and the like). Connections are kept alive and
+# reused per (scheme, host, port); at most `max_per_host` requests run
+# against one host at a time and idle connections are dropped after
+# `idle_timeout` seconds. Proxies from the environment are honoured as
+# urllib would. Bodies are read in full, so this is for small resources.
+class HTTPClient:
+    def __init__(self, max_per_host=HTTP_MAX_PER_HOST, timeout=HTTP_TIMEOUT,
+                 idle_timeout=HTTP_IDLE_TIMEOUT, user_agent=HTTP_USER_AGENT):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.user_agent = user_agent
+        self._idle = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+        self._context = None
+
+    # `validators` as returned by validators() make this a conditional GET;
+    # an unchanged resource comes back as a 304 response with no body.
+    def get(self, url, headers=None, validators=None):
+        headers = {"User-Agent": self.user_agent, **(headers or {})}
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._request(url, headers)
+            location = response.headers.get("Location")
+            if response.status not in REDIRECTS or not location:
+                break
+            url = urljoin(url, location)
+        if response.status >= 400 or response.status in REDIRECTS:
+            raise HTTPError(response)
+        return response
+
+    def _request(self, url, headers):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"unsupported URL: {url}")
+        key = (parts.scheme, parts.hostname, parts.port)
+        proxy = self._proxy(parts.scheme, parts.hostname)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        if proxy and parts.scheme == "http":
+            # Plain HTTP goes through the proxy with absolute URLs.
+            target = f"http://{parts.netloc}{target}"
+
+        with self._slot(key):
+            conn, reused = self._checkout(key)
+            try:
+                if conn is None:
+                    conn = self._connect(key, proxy)
+                try:
+                    response = self._send(conn, target, headers)
+                except STALE_CONNECTION:
+                    if not reused:
+                        raise
+                    conn.close()
+                    conn = self._connect(key, proxy)
+                    response = self._send(conn, target, headers)
+                body = response.read()
+            except BaseException:
+                if conn is not None:
+                    conn.close()
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._checkin(key, conn)
+        return Response(response.status, response.headers, body, url)
+
+    @staticmethod
+    def _send(conn, target, headers):
+        conn.request("GET", target, headers=headers)
+        return conn.getresponse()
+
+    def _slot(self, key):
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = threading.BoundedSemaphore(self.max_per_host)
+        return slot
+
+    def _checkout(self, key):
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key) or []
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used < self.idle_timeout:
+                    return conn, True
+                conn.close()
+        return None, False
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            self._idle.setdefault(key, []).append((conn, time.monotonic()))
+
+    def _connect(self, key, proxy):
+        scheme, host, port = key
+        if scheme == "http":
+            if proxy:
+                host, port = proxy.hostname, proxy.port or 80
+            return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+        if self._context is None:
+            self._context = ssl.create_default_context()
+        if not proxy:
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._context)
+        # CONNECT through the proxy, then TLS to the real host.
+        conn = http.client.HTTPSConnection(
+            proxy.hostname, proxy.port or 80, timeout=self.timeout, context=self._context
+        )
+        conn.set_tunnel(host, port)
+        return conn
+
+    @staticmethod
+    def _proxy(scheme, host):
+        proxy = urllib.request.getproxies().get(scheme)
+        if not proxy or urllib.request.proxy_bypass(host):
+            return None
+        return urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn, _ in connections:
+                conn.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+# The process-wide client, so every part of the app shares its pool.
+def shared_client():
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HTTPClient()
+        return _shared
@@ -0,0 +1,70 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+LogRecord = namedtuple("LogRecord", "timestamp level message")
+
+
+# Appends full history to a JSON-lines file from a background thread, so
+# callers never wait on disk I/O.
+class JsonlSink:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        self._queue.put(record)
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            while record is not None:
+                self._file.write(json.dumps(record._asdict(), ensure_ascii=False) + "\n")
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._file.flush()
+            if record is None:
+                self._file.close()
+                return
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2)
+
+
+# Fixed-capacity log: keeps the last `capacity` records in memory and
+# remembers which ones the UI has not shown yet. Safe to append to from
+# any thread.
+class LogBuffer:
+    def __init__(self, capacity=1000, sink_path=None):
+        self.records = deque(maxlen=capacity)
+        self._pending = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._sink = JsonlSink(sink_path) if sink_path else None
+
+    def append(self, message, level="info"):
+        record = LogRecord(time.time(), level, message)
+        with self._lock:
+            self.records.append(record)
+            self._pending.append(record)
+        if self._sink:
+            self._sink.write(record)
+        return record
+
+    def take_pending(self):
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+        return pending
+
+    def close(self):
+        if self._sink:
+            self._sink.close()
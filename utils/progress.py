@@ -0,0 +1,20 @@
+import threading
+
+
+# Latest-value mailbox between worker threads and the UI. Writers overwrite
+# the slot for their key instead of queueing every update, and the UI
+# drains all slots at a fixed rate, so the cost of rendering does not grow
+# with the number of progress callbacks.
+class ProgressSlots:
+    def __init__(self):
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def put(self, key, value):
+        with self._lock:
+            self._slots[key] = value
+
+    def drain(self):
+        with self._lock:
+            slots, self._slots = self._slots, {}
+        return slots
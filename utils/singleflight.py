@@ -0,0 +1,84 @@
+import threading
+
+from utils.cancel import JobStopped
+
+# How often a waiting caller checks its own stop token.
+STOP_POLL = 0.2
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.hooks = []
+
+    def hook(self, d):
+        for hook in list(self.hooks):
+            hook(d)
+
+
+# Collapses concurrent calls with the same key into one. The first caller
+# runs the work; callers arriving while it is in flight wait for it and get
+# the same result or exception. Progress hooks of every caller are attached
+# to the running call, so late joiners see its remaining progress.
+#
+# A waiting caller with a `stop` token leaves as soon as it is stopped,
+# without affecting the others. If the leader is stopped instead, the
+# callers still waiting run the work again under a new leader.
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    # `fn` is called with a progress hook that fans out to all callers.
+    def run(self, key, fn, hook=None, stop=None):
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                if hook:
+                    flight.hooks.append(hook)
+            if leader:
+                break
+
+            while not flight.done.wait(STOP_POLL if stop else None):
+                if stop.requested:
+                    with self._lock:
+                        if hook in flight.hooks:
+                            flight.hooks.remove(hook)
+                    stop.check()
+            if isinstance(flight.error, JobStopped):
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn(flight.hook)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    # Waits for an in-flight call with this key, if there is one, and
+    # returns its result; None when nothing was running or it failed. A
+    # caller with a `stop` token stops waiting as soon as it is stopped.
+    def wait(self, key, stop=None):
+        with self._lock:
+            flight = self._flights.get(key)
+        if flight is None:
+            return None
+        while not flight.done.wait(STOP_POLL if stop else None):
+            stop.check()
+        return flight.result if flight.error is None else None
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._flights
@@ -0,0 +1,95 @@
+import re
+from urllib.parse import parse_qs, urlparse
+
+_YOUTUBE_HOSTS = {
+    "youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com",
+    "youtube-nocookie.com", "www.youtube-nocookie.com",
+}
+_VIDEO_ID_RE = re.compile(r"^[0-9A-Za-z_-]{11}$")
+_PATH_PREFIXES = ("/shorts/", "/embed/", "/live/", "/v/")
+_CHANNEL_PREFIXES = ("/@", "/channel/", "/c/", "/user/")
+
+# Other names of the same servers, for limits that apply per host.
+_HOST_ALIASES = {
+    "youtu.be": "youtube.com",
+    "music.youtube.com": "youtube.com",
+    "youtube-nocookie.com": "youtube.com",
+}
+
+
+def extract_video_id(url):
+    try:
+        parsed = urlparse(url.strip())
+    except ValueError:
+        return None
+    host = (parsed.hostname or "").lower()
+
+    candidate = None
+    if host in ("youtu.be", "www.youtu.be"):
+        candidate = parsed.path.lstrip("/").split("/")[0]
+    elif host in _YOUTUBE_HOSTS:
+        if parsed.path == "/watch":
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+        else:
+            for prefix in _PATH_PREFIXES:
+                if parsed.path.startswith(prefix):
+                    candidate = parsed.path[len(prefix):].split("/")[0]
+                    break
+    elif _VIDEO_ID_RE.match(url.strip()):
+        candidate = url.strip()
+
+    if candidate and _VIDEO_ID_RE.match(candidate):
+        return candidate
+    return None
+
+
+# A full URL of a single video, as opposed to a bare id or a playlist.
+def is_video_url(url):
+    try:
+        host = urlparse(url.strip()).hostname
+    except ValueError:
+        return False
+    return bool(host) and extract_video_id(url) is not None and not is_playlist_url(url)
+
+
+def is_playlist_url(url):
+    try:
+        parsed = urlparse(url.strip())
+    except ValueError:
+        return False
+    if (parsed.hostname or "").lower() not in _YOUTUBE_HOSTS:
+        return False
+    if parsed.path == "/playlist" or "list" in parse_qs(parsed.query):
+        return True
+    return parsed.path.startswith(_CHANNEL_PREFIXES)
+
+
+# Host of `url` without "www." or "m.", with YouTube's short and alternative
+# domains mapped to youtube.com, so they all count as one host.
+def host_key(url):
+    try:
+        host = (urlparse(url.strip()).hostname or "").lower()
+    except ValueError:
+        return ""
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    return _HOST_ALIASES.get(host, host)
+
+
+def cache_key(url):
+    video_id = extract_video_id(url)
+    return f"youtube:{video_id}" if video_id else url.strip()
+
+
+def parse_url_list(text):
+    urls = []
+    seen = set()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or line in seen:
+            continue
+        seen.add(line)
+        urls.append(line)
+    return urls
@@ -0,0 +1,438 @@
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from controllers.scheduler import CANCELLED, DONE, FAILED, PAUSED, QUEUED, RUNNING
+from utils.formatters import format_bytes, format_speed
+from utils.progress import ProgressSlots
+
+ROW_HEIGHT = 22
+
+# A table sorted or filtered on something that keeps changing (progress,
+# speed, state) is re-ordered at most this often, not on every refresh.
+SORT_INTERVAL = 0.5
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+STATE_FILTERS = {
+    "All": None,
+    "Active": (QUEUED, RUNNING, PAUSED),
+    "Running": (RUNNING,),
+    "Queued": (QUEUED,),
+    "Paused": (PAUSED,),
+    "Done": (DONE,),
+    "Failed": (FAILED, CANCELLED),
+}
+
+# (key, heading, width); the title column takes the remaining width.
+COLUMNS = (
+    ("id", "#", 48),
+    ("title", "Title", None),
+    ("state", "State", 78),
+    ("progress", "Progress", 120),
+    ("speed", "Speed", 84),
+)
+
+STATE_COLORS = {
+    RUNNING: "#3a86ff",
+    PAUSED: "#e0a030",
+    DONE: "#40c070",
+    FAILED: "#ff5060",
+    CANCELLED: "#808080",
+}
+
+
+class JobRow:
+    __slots__ = ("job", "id", "kind", "title", "state", "downloaded", "total", "speed")
+
+    def __init__(self, job):
+        self.job = job
+        self.id = job.id
+        self.kind = job.kind
+        self.title = job.url
+        self.state = job.state
+        self.downloaded = 0
+        self.total = None
+        self.speed = None
+
+    @property
+    def fraction(self):
+        if self.state == DONE:
+            return 1.0
+        return min(self.downloaded / self.total, 1.0) if self.total else 0.0
+
+    def sort_value(self, key):
+        if key == "progress":
+            return self.fraction
+        if key == "speed":
+            return self.speed or 0
+        if key == "title":
+            return self.title.lower()
+        return getattr(self, key)
+
+    def cells(self):
+        if self.total:
+            progress = f"{self.fraction * 100:.0f}% of {format_bytes(self.total)}"
+        elif self.downloaded:
+            progress = format_bytes(self.downloaded)
+        else:
+            progress = ""
+        speed = format_speed(self.speed) if self.state == RUNNING and self.speed else ""
+        return str(self.id), self.title, self.state, progress, speed
+
+
+# Rows of the job table and the filtered, sorted order they are shown in.
+# Updates touch only the rows that changed; the order is rebuilt when rows
+# join, or when a change can move a row under the current sort or filter,
+# and then no more than every SORT_INTERVAL.
+class JobRows:
+    def __init__(self):
+        self.rows = {}
+        self.order = []
+        self.sort_key = "id"
+        self.descending = False
+        self.text = ""
+        self.states = None
+        self._dirty = False
+        self._sorted_at = 0.0
+
+    def matches(self, row):
+        if self.states is not None and row.state not in self.states:
+            return False
+        return not self.text or self.text in row.title.lower()
+
+    # `jobs` are scheduler Jobs whose state changed; `progress` maps a job
+    # id to (title, downloaded, total, speed). Coalesced updates arrive in
+    # no particular order, so new rows are taken in job id order.
+    def apply(self, jobs, progress):
+        for job in sorted(jobs, key=lambda job: job.id):
+            row = self.rows.get(job.id)
+            if row is None:
+                row = self.rows[job.id] = JobRow(job)
+                if not self.matches(row):
+                    continue
+                # Job ids only grow, so the default order just appends.
+                if self.sort_key == "id" and not self.descending and not self._dirty:
+                    self.order.append(row.id)
+                else:
+                    self._dirty = True
+            elif row.state != job.state:
+                row.state = job.state
+                if self.states is not None or self.sort_key in ("state", "progress", "speed"):
+                    self._dirty = True
+
+        for job_id, (title, downloaded, total, speed) in progress.items():
+            row = self.rows.get(job_id)
+            if row is None:
+                continue
+            if title and title != row.title:
+                row.title = title
+                if self.text or self.sort_key == "title":
+                    self._dirty = True
+            row.downloaded, row.total, row.speed = downloaded, total, speed
+            if self.sort_key in ("progress", "speed"):
+                self._dirty = True
+
+    # Rebuilds the order if it is stale. Returns True if it did.
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not (force or self._dirty and now - self._sorted_at >= SORT_INTERVAL):
+            return False
+        key = self.sort_key
+        rows = [row for row in self.rows.values() if self.matches(row)]
+        rows.sort(key=lambda row: (row.sort_value(key), row.id), reverse=self.descending)
+        self.order = [row.id for row in rows]
+        self._dirty = False
+        self._sorted_at = now
+        return True
+
+    def sort_by(self, key):
+        if key == self.sort_key:
+            self.descending = not self.descending
+        else:
+            self.sort_key, self.descending = key, key in ("progress", "speed")
+        self.refresh(force=True)
+
+    def filter(self, text, states):
+        self.text = text.strip().lower()
+        self.states = states
+        self.refresh(force=True)
+
+    def clear_finished(self):
+        self.rows = {k: row for k, row in self.rows.items() if row.state not in FINISHED}
+        self.refresh(force=True)
+
+
+# Virtualized list of jobs on a Canvas. Only a fixed pool of row slots is
+# drawn, one per visible line; scrolling re-binds the slots to other rows
+# and a refresh rewrites just the slot items whose text or colour changed,
+# so the cost of a frame depends on the window height, not on the number
+# of jobs. Worker threads report through job_changed() and job_progress();
+# the Tk thread applies those updates in refresh().
+class JobTable:
+    # `on_action(action, job)` is called from the row menu with "pause",
+    # "resume", "cancel" or "cancel-keep".
+    def __init__(self, parent, on_action=None):
+        self.on_action = on_action
+        self.data = JobRows()
+        self.updates = ProgressSlots()
+        self._top = 0
+        self._slots = []
+        self._shown = []
+        self._widths = {}
+        self._menu_row = None
+
+        self.frame = tk.Frame(parent, bg="#1a1a1a")
+
+        self.toolbar = tk.Frame(self.frame, bg="#1a1a1a")
+        self.toolbar.pack(fill="x", padx=10, pady=(8, 4))
+
+        self.filter_text = tk.StringVar()
+        self.filter_text.trace_add("write", lambda *_: self._apply_filter())
+        tk.Entry(
+            self.toolbar,
+            textvariable=self.filter_text,
+            font=("Segoe UI", 9),
+            bg="#2d2d2d",
+            fg="#e0e0e0",
+            insertbackground="#ffffff",
+            bd=0,
+            highlightthickness=0,
+            relief="flat",
+            width=24
+        ).pack(side="left", ipady=4, padx=(0, 8))
+
+        self.filter_state = tk.StringVar(value="All")
+        ttk.OptionMenu(
+            self.toolbar,
+            self.filter_state,
+            "All",
+            *STATE_FILTERS,
+            style="Modern.TMenubutton",
+            command=lambda _: self._apply_filter()
+        ).pack(side="left", padx=(0, 8))
+
+        self.count_label = tk.Label(
+            self.toolbar,
+            text="0 jobs",
+            font=("Segoe UI", 9),
+            bg="#1a1a1a",
+            fg="#606060"
+        )
+        self.count_label.pack(side="left")
+
+        self.header = tk.Canvas(
+            self.frame, height=ROW_HEIGHT, bg="#1a1a1a", bd=0, highlightthickness=0
+        )
+        self.header.pack(fill="x", padx=10)
+        self.header.bind("<Button-1>", self._on_header_click)
+
+        body = tk.Frame(self.frame, bg="#1a1a1a")
+        body.pack(fill="both", expand=True, padx=(10, 0), pady=(0, 8))
+        self.scrollbar = ttk.Scrollbar(body, orient="vertical", command=self._yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas = tk.Canvas(body, bg="#1a1a1a", bd=0, highlightthickness=0)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.bind("<Configure>", self._on_resize)
+        self.canvas.bind("<MouseWheel>", lambda e: self._scroll(-1 if e.delta > 0 else 1))
+        self.canvas.bind("<Button-4>", lambda e: self._scroll(-1))
+        self.canvas.bind("<Button-5>", lambda e: self._scroll(1))
+        self.canvas.bind("<Button-3>", self._on_menu)
+
+        self.menu = tk.Menu(self.frame, tearoff=False)
+        self.menu.add_command(label="⏸️ Pause", command=lambda: self._act("pause"))
+        self.menu.add_command(label="▶️ Resume", command=lambda: self._act("resume"))
+        self.menu.add_separator()
+        self.menu.add_command(label="⏹️ Cancel", command=lambda: self._act("cancel"))
+        self.menu.add_command(
+            label="⏹️ Cancel, keep partial files", command=lambda: self._act("cancel-keep")
+        )
+
+    # Thread-safe: called from worker threads.
+    def job_changed(self, job):
+        self.updates.put(("job", job.id), job)
+
+    def job_progress(self, job, d):
+        title = (d.get("info_dict") or {}).get("title")
+        total = d.get("total_bytes") or d.get("total_bytes_estimate")
+        self.updates.put(
+            ("progress", job.id), (title, d.get("downloaded_bytes") or 0, total, d.get("speed"))
+        )
+
+    def clear_finished(self):
+        self.data.clear_finished()
+        self._render()
+
+    # Tk thread: applies what the workers reported since the last call.
+    def refresh(self):
+        slots = self.updates.drain()
+        if not slots:
+            if self.data.refresh():
+                self._render()
+            return
+        jobs = [value for (kind, _), value in slots.items() if kind == "job"]
+        progress = {job_id: value for (kind, job_id), value in slots.items() if kind == "progress"}
+        self.data.apply(jobs, progress)
+        self.data.refresh()
+        self._render()
+
+    # =========================
+    # Layout and drawing
+    # =========================
+    def _visible_rows(self):
+        return max(1, self.canvas.winfo_height() // ROW_HEIGHT)
+
+    def _on_resize(self, event):
+        fixed = sum(width for _, _, width in COLUMNS if width)
+        x = 6
+        for key, _, width in COLUMNS:
+            width = width or max(80, event.width - fixed - 12)
+            self._widths[key] = (x, width)
+            x += width
+
+        self.canvas.delete("all")
+        self._slots, self._shown = [], []
+        for i in range(event.height // ROW_HEIGHT + 1):
+            self._slots.append(self._create_slot(i * ROW_HEIGHT, event.width))
+            self._shown.append(None)
+        self._draw_header()
+        self._render()
+
+    def _create_slot(self, y, width):
+        canvas = self.canvas
+        mid = y + ROW_HEIGHT // 2
+        items = {
+            "bg": canvas.create_rectangle(
+                0, y, width, y + ROW_HEIGHT, fill="#1a1a1a", width=0, state="hidden"
+            ),
+        }
+        for key, _, _ in COLUMNS:
+            x, column_width = self._widths[key]
+            if key == "progress":
+                items["trough"] = canvas.create_rectangle(
+                    x, mid + 5, x + column_width - 12, mid + 8,
+                    fill="#2d2d2d", width=0, state="hidden"
+                )
+                items["bar"] = canvas.create_rectangle(
+                    x, mid + 5, x, mid + 8, fill="#3a86ff", width=0, state="hidden"
+                )
+                mid_text = mid - 3
+            else:
+                mid_text = mid
+            items[key] = canvas.create_text(
+                x, mid_text, anchor="w", text="", fill="#e0e0e0",
+                font=("Segoe UI", 8 if key == "progress" else 9)
+            )
+        return items
+
+    def _draw_header(self):
+        self.header.delete("all")
+        for key, heading, _ in COLUMNS:
+            x, _ = self._widths[key]
+            if key == self.data.sort_key:
+                heading += " ▼" if self.data.descending else " ▲"
+            self.header.create_text(
+                x, ROW_HEIGHT // 2, anchor="w", text=heading,
+                fill="#a0a0a0", font=("Segoe UI", 9, "bold")
+            )
+
+    # Rebinds the slots to the rows from self._top on and touches only the
+    # canvas items whose content changed since they were last drawn.
+    def _render(self):
+        order = self.data.order
+        visible = self._visible_rows()
+        self._top = max(0, min(self._top, len(order) - visible))
+        total = len(self.data.rows)
+        shown = len(order)
+        self.count_label.config(
+            text=f"{shown} jobs" if shown == total else f"{shown} of {total} jobs"
+        )
+        if order:
+            self.scrollbar.set(self._top / len(order), min(1.0, (self._top + visible) / len(order)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+        canvas = self.canvas
+        for i, items in enumerate(self._slots):
+            index = self._top + i
+            row = self.data.rows.get(order[index]) if index < len(order) else None
+            content = None if row is None else (row.cells(), row.fraction, index % 2)
+            if content == self._shown[i]:
+                continue
+            self._shown[i] = content
+            if row is None:
+                for item in items.values():
+                    canvas.itemconfigure(item, state="hidden")
+                continue
+
+            cells, fraction, odd = content
+            canvas.itemconfigure(items["bg"], state="normal",
+                                 fill="#202020" if odd else "#1a1a1a")
+            for (key, _, _), text in zip(COLUMNS, cells):
+                x, width = self._widths[key]
+                canvas.itemconfigure(items[key], state="normal", text=_clip(text, width))
+            canvas.itemconfigure(items["state"], fill=STATE_COLORS.get(row.state, "#a0a0a0"))
+
+            x, width = self._widths["progress"]
+            y0 = canvas.coords(items["bar"])[1]
+            has_bar = row.total is not None or row.state == DONE
+            canvas.itemconfigure(items["trough"], state="normal" if has_bar else "hidden")
+            canvas.itemconfigure(items["bar"], state="normal" if has_bar else "hidden")
+            canvas.coords(items["bar"], x, y0, x + (width - 12) * fraction, y0 + 3)
+
+    # =========================
+    # Scrolling, sorting, filtering
+    # =========================
+    def _yview(self, *args):
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * len(self.data.order))
+        elif args[0] == "scroll":
+            step = self._visible_rows() if args[2] == "pages" else 1
+            self._top += int(args[1]) * step
+        self._render()
+
+    def _scroll(self, lines):
+        self._top += lines * 3
+        self._render()
+
+    def _on_header_click(self, event):
+        for key, _, _ in COLUMNS:
+            x, width = self._widths[key]
+            if x <= event.x < x + width:
+                self.data.sort_by(key)
+                self._draw_header()
+                self._render()
+                return
+
+    def _apply_filter(self):
+        self.data.filter(self.filter_text.get(), STATE_FILTERS[self.filter_state.get()])
+        self._top = 0
+        self._render()
+
+    # =========================
+    # Row menu
+    # =========================
+    def _on_menu(self, event):
+        index = self._top + event.y // ROW_HEIGHT
+        if index >= len(self.data.order) or not self.on_action:
+            return
+        row = self.data.rows[self.data.order[index]]
+        self._menu_row = row
+        active = row.state in (QUEUED, RUNNING)
+        self.menu.entryconfigure(0, state="normal" if active else "disabled")
+        self.menu.entryconfigure(1, state="normal" if row.state == PAUSED else "disabled")
+        cancellable = "disabled" if row.state in FINISHED else "normal"
+        self.menu.entryconfigure(3, state=cancellable)
+        self.menu.entryconfigure(4, state=cancellable)
+        self.menu.tk_popup(event.x_root, event.y_root)
+
+    def _act(self, action):
+        if self._menu_row is not None:
+            self.on_action(action, self._menu_row.job)
+            self._menu_row = None
+
+
+# Cuts `text` to roughly what fits in `width` pixels of the table font.
+def _clip(text, width):
+    limit = max(4, width // 7)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
@@ -1,14 +1,24 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
-import urllib.request
-import io
-
-from utils.formatters import format_duration, format_number
+from tkinter import ttk, messagebox, filedialog
+
+from models.formats import FormatIndex
+from models.options import QUALITY_FORMATS, download_options
+from utils.constants import (
+    LOG_CAPACITY, LOG_FLUSH_MS, LOG_MAX_LINES, PREFETCH_DEBOUNCE_MS,
+    PROGRESS_REFRESH_MS
+)
+from utils.formatters import (
+    format_bytes, format_duration, format_number, format_speed
+)
+from utils.logbuffer import LogBuffer
+from utils.progress import ProgressSlots
+from utils.urls import cache_key, is_video_url, parse_url_list
+from views.job_table import JobTable
+from views.thumbnails import ThumbnailLoader
 
 
 class MainView:
-    def __init__(self, root):
+    def __init__(self, root, log_path=None):
         self.root = root
         self.root.title("YouTube Downloader")
         self.root.geometry("1100x750")
@@ -16,9 +26,19 @@ class MainView:
 
         self.controller = None
         self.thumbnail_img = None
+        self._thumbnail_url = None
+        self._format_index = None
+        self._format_source = None
+        self._format_choices = {}
+        self._prefetch_pending = None
+        self.thumbnails = ThumbnailLoader(self.root, (340, 191))
+        self.progress = ProgressSlots()
+        self.log = LogBuffer(LOG_CAPACITY, log_path)
         self._build_ui()
         self._apply_modern_theme()
         self._bind_accessibility()
+        self._refresh_progress()
+        self._flush_log()
 
     
     # Controller Binding
@@ -26,6 +46,10 @@ class MainView:
     def set_controller(self, controller):
         self.controller = controller
 
+    def close(self):
+        self.thumbnails.close()
+        self.log.close()
+
     # UI Construction
     
     def _build_ui(self):
@@ -85,13 +109,15 @@ class MainView:
         )
         url_label.pack(anchor="w", pady=(0, 8))
 
+        self.url_var = tk.StringVar(value="https://www.youtube.com/watch?v= ...")
         self.url_entry = ttk.Entry(
             self.left, 
             font=("Segoe UI", 12),
-            style="Modern.TEntry"
+            style="Modern.TEntry",
+            textvariable=self.url_var
         )
         self.url_entry.pack(fill="x", pady=(0, 25), ipady=12)
-        self.url_entry.insert(0, "https://www.youtube.com/watch?v= ...")
+        self.url_var.trace_add("write", self._on_url_changed)
 
         # Download Type
         type_frame = tk.Frame(self.left, bg="#0a0a0a")
@@ -126,14 +152,14 @@ class MainView:
         quality_label.pack(anchor="w", pady=(0, 8))
 
         self.quality = tk.StringVar(value="1080p")
-        quality_menu = ttk.OptionMenu(
+        self.quality_menu = ttk.OptionMenu(
             self.left,
             self.quality,
             "1080p",
-            "720p", "1080p", "4K",
+            *QUALITY_FORMATS,
             style="Modern.TMenubutton"
         )
-        quality_menu.pack(anchor="w", pady=(0, 25))
+        self.quality_menu.pack(anchor="w", pady=(0, 25))
 
         # Buttons
         btn_frame = tk.Frame(self.left, bg="#0a0a0a")
@@ -153,7 +179,15 @@ class MainView:
             style="Action.TButton",
             command=self._on_download
         )
-        self.download_btn.pack(side="left", expand=True, fill="x")
+        self.download_btn.pack(side="left", expand=True, fill="x", padx=(0, 10))
+
+        self.batch_btn = ttk.Button(
+            btn_frame,
+            text="📦 Batch",
+            style="Type.TButton",
+            command=self._open_batch_dialog
+        )
+        self.batch_btn.pack(side="left")
 
         # Progress
         self.progress_bar = ttk.Progressbar(
@@ -172,11 +206,23 @@ class MainView:
             bg="#0a0a0a",
             fg="#a0a0a0"
         )
-        self.progress_label.pack(anchor="w", pady=(0, 20))
+        self.progress_label.pack(anchor="w", pady=(0, 5))
 
-        # Status
-        status_container = tk.Frame(self.left, bg="#1a1a1a")
-        status_container.pack(fill="both", expand=True)
+        self.queue_label = tk.Label(
+            self.left,
+            text="Queue: idle",
+            font=("Segoe UI", 9),
+            bg="#0a0a0a",
+            fg="#606060"
+        )
+        self.queue_label.pack(anchor="w", pady=(0, 15))
+
+        # Status log and job list
+        self.tabs = ttk.Notebook(self.left, style="Modern.TNotebook")
+        self.tabs.pack(fill="both", expand=True)
+
+        status_container = tk.Frame(self.tabs, bg="#1a1a1a")
+        self.tabs.add(status_container, text="Log")
 
         self.status = tk.Text(
             status_container, 
@@ -191,6 +237,33 @@ class MainView:
         )
         self.status.pack(fill="both", expand=True, padx=15, pady=15)
 
+        self.jobs = JobTable(self.tabs, self._on_job_action)
+        self.tabs.add(self.jobs.frame, text="Jobs")
+
+        # Job controls
+        ttk.Button(
+            self.jobs.toolbar,
+            text="🧹 Clear",
+            style="Small.TButton",
+            command=self.jobs.clear_finished
+        ).pack(side="right")
+
+        self.cancel_btn = ttk.Button(
+            self.jobs.toolbar,
+            text="⏹️ Cancel",
+            style="Small.TButton",
+            command=self._on_cancel
+        )
+        self.cancel_btn.pack(side="right", padx=(8, 0))
+
+        self.pause_btn = ttk.Button(
+            self.jobs.toolbar,
+            text="⏸️ Pause",
+            style="Small.TButton",
+            command=self._on_pause
+        )
+        self.pause_btn.pack(side="right", padx=(8, 0))
+
     # =========================
     # Right Panel
     # =========================
@@ -265,6 +338,19 @@ class MainView:
     # =========================
     # Actions
     # =========================
+    # Debounced: every paste or keystroke restarts the timer, and only a
+    # value that stays put and looks like a video URL is prefetched.
+    def _on_url_changed(self, *_):
+        if self._prefetch_pending is not None:
+            self.root.after_cancel(self._prefetch_pending)
+        self._prefetch_pending = self.root.after(PREFETCH_DEBOUNCE_MS, self._prefetch)
+
+    def _prefetch(self):
+        self._prefetch_pending = None
+        url = self.url_var.get().strip()
+        if self.controller and is_video_url(url):
+            self.controller.prefetch(url)
+
     def _on_fetch(self):
         url = self.url_entry.get().strip()
         if not self.controller:
@@ -280,28 +366,145 @@ class MainView:
 
         self.download_btn.config(state="disabled")
         self.log_status("⬇️ Starting download...")
+        self.controller.download(url, self._download_options(url))
+
+    # Pauses everything that is queued or running; with nothing left to
+    # pause it resumes the paused jobs instead.
+    def _on_pause(self):
+        if not self.controller:
+            return
+        if not self.controller.pause_all():
+            self.controller.resume_all()
 
-        if self.download_type.get() == "audio":
-            opts = {
-                "format": "bestaudio/best",
-                "postprocessors": [
-                    {"key": "FFmpegExtractAudio", "preferredcodec": "mp3"},
-                    {"key": "FFmpegMetadata"},
-                    {"key": "EmbedThumbnail"},
-                ],
-            }
+    def _on_cancel(self):
+        if not self.controller or not self.controller.scheduler.jobs():
+            return
+        discard = messagebox.askyesnocancel(
+            "Cancel downloads",
+            "Cancel all queued, running and paused jobs.\n\n"
+            "Delete the partly downloaded files too?"
+        )
+        if discard is not None:
+            self.controller.cancel_all(keep_partial=not discard)
+
+    def _on_job_action(self, action, job):
+        if not self.controller:
+            return
+        if action == "pause":
+            self.controller.pause(job)
+        elif action == "resume":
+            self.controller.resume(job)
+        else:
+            self.controller.cancel(job, keep_partial=action == "cancel-keep")
+
+    # Qualities picked from a fetched video's own format list name exact
+    # format IDs for that video; any other URL gets the matching generic
+    # expression.
+    def _download_options(self, url=None):
+        choice = self._format_choices.get(self.quality.get())
+        if choice is None:
+            return download_options(self.download_type.get(), self.quality.get())
+
+        options = download_options(self.download_type.get())
+        if url and cache_key(url) == self._format_source:
+            options["format"] = choice.format
         else:
-            quality_map = {
-                "720p": "bestvideo[height<=720]+bestaudio/best",
-                "1080p": "bestvideo[height<=1080]+bestaudio/best",
-                "4K": "bestvideo[height<=2160]+bestaudio/best",
-            }
-            opts = {
-                "format": quality_map[self.quality.get()],
-                "merge_output_format": "mp4",
-            }
-
-        self.controller.download(url, opts)
+            options["format"] = choice.fallback
+        return options
+
+    def _show_formats(self, info):
+        if not info.get("formats"):
+            return
+        source = cache_key(info.get("webpage_url") or info.get("original_url") or "")
+        if source == self._format_source:
+            return
+        self._format_source = source
+        self._format_index = FormatIndex(info)
+        self._fill_quality_menu()
+
+    def _fill_quality_menu(self):
+        menu = self.quality_menu["menu"]
+        menu.delete(0, "end")
+        video = self.download_type.get() == "video"
+        choices = self._format_index.choices(self.download_type.get()) if self._format_index else []
+        self._format_choices = {c.label: c for c in choices}
+        if choices:
+            labels = list(self._format_choices)
+            # Same default as before formats were known: up to 1080p.
+            default = next((c.label for c in choices if (c.height or 0) <= 1080), labels[0])
+        elif video:
+            labels, default = list(QUALITY_FORMATS), "1080p"
+        else:
+            labels, default = ["best"], "best"
+        for label in labels:
+            menu.add_command(label=label, command=tk._setit(self.quality, label))
+        self.quality.set(default)
+
+    def _open_batch_dialog(self):
+        if not self.controller:
+            return
+
+        dialog = tk.Toplevel(self.root, bg="#0a0a0a")
+        dialog.title("Batch Download")
+        dialog.geometry("640x420")
+        dialog.transient(self.root)
+
+        hint = tk.Label(
+            dialog,
+            text="One URL per line (lines starting with # are ignored)",
+            font=("Segoe UI", 10),
+            bg="#0a0a0a",
+            fg="#a0a0a0"
+        )
+        hint.pack(anchor="w", padx=20, pady=(20, 8))
+
+        urls_text = tk.Text(
+            dialog,
+            font=("Consolas", 10),
+            bg="#1a1a1a",
+            fg="#e0e0e0",
+            insertbackground="#ffffff",
+            bd=0,
+            highlightthickness=0,
+            relief="flat"
+        )
+        urls_text.pack(fill="both", expand=True, padx=20)
+
+        def load_file():
+            path = filedialog.askopenfilename(
+                parent=dialog,
+                filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+            )
+            if path:
+                with open(path, encoding="utf-8") as f:
+                    urls_text.insert("end", f.read())
+
+        def start():
+            urls = parse_url_list(urls_text.get("1.0", "end"))
+            if not urls:
+                messagebox.showerror("Error", "No URLs to download.", parent=dialog)
+                return
+            dialog.destroy()
+            self.batch_btn.config(state="disabled")
+            self.tabs.select(self.jobs.frame)
+            self.controller.download_batch(urls, self._download_options())
+
+        btn_frame = tk.Frame(dialog, bg="#0a0a0a")
+        btn_frame.pack(fill="x", padx=20, pady=20)
+
+        ttk.Button(
+            btn_frame,
+            text="📂 Load File",
+            style="Type.TButton",
+            command=load_file
+        ).pack(side="left", expand=True, fill="x", padx=(0, 10))
+
+        ttk.Button(
+            btn_frame,
+            text="⬇️ Start Batch",
+            style="Action.TButton",
+            command=start
+        ).pack(side="left", expand=True, fill="x")
 
     
     # UI Updates (Called by Controller)
@@ -316,41 +519,105 @@ class MainView:
         self.likes_label.config(text=f"👍 {format_number(info.get('like_count'))}")
         self.comments_label.config(text=f"💬 {format_number(info.get('comment_count'))}")
 
-        self._set_thumbnail(info.get("thumbnail"))
+        self._set_thumbnail(self.thumbnails.pick(info))
+        self._show_formats(info)
 
     def _set_thumbnail(self, url):
+        self._thumbnail_url = url
         if not url:
             self.thumb_label.config(text="No thumbnail", image="")
             return
-        try:
-            data = urllib.request.urlopen(url).read()
-            img = Image.open(io.BytesIO(data)).resize((340, 191))
-            self.thumbnail_img = ImageTk.PhotoImage(img)
-            self.thumb_label.config(image=self.thumbnail_img, text="")
-        except Exception:
+        self.thumbnails.load(url, lambda photo: self._show_thumbnail(url, photo))
+
+    def _show_thumbnail(self, url, photo):
+        if url != self._thumbnail_url:
+            return
+        if photo is None:
             self.thumb_label.config(text="Thumbnail error", image="")
+            return
+        self.thumbnail_img = photo
+        self.thumb_label.config(image=self.thumbnail_img, text="")
 
     def progress_hook(self, d):
         if d["status"] == "downloading":
             percent = float(d.get("_percent_str", "0%").replace("%", "").strip())
-            self.root.after(0, self._update_progress, percent)
+            self.progress.put("download", percent)
 
         elif d["status"] == "finished":
-            self.root.after(0, self._update_progress, 100)
+            self.progress.put("download", 100)
+
+    # Worker threads only write into self.progress; everything they report
+    # is rendered here in one pass at a fixed rate.
+    def _refresh_progress(self):
+        slots = self.progress.drain()
+        if "download" in slots:
+            self._update_progress(slots["download"])
+        if "batch" in slots:
+            self.update_batch_progress(slots["batch"].summary())
+        if "queue" in slots:
+            self.update_queue(slots["queue"].stats())
+        self.jobs.refresh()
+        self.root.after(PROGRESS_REFRESH_MS, self._refresh_progress)
 
     def _update_progress(self, percent):
         self.progress_bar["value"] = percent
         self.progress_label.config(text=f"{percent:.1f}%")
 
+    def update_batch_progress(self, summary):
+        finished = summary["completed"] + summary["failed"] + summary["cancelled"]
+        total = summary["total_bytes"]
+        percent = summary["downloaded_bytes"] / total * 100 if total else 0
+        eta = summary["eta"]
+
+        self.progress_bar["value"] = 100 if summary["done"] else percent
+        self.progress_label.config(
+            text=(
+                f"Batch {finished}/{summary['total_jobs']}"
+                f"{'+' if summary['expanding'] else ''}"
+                f" · {format_bytes(summary['downloaded_bytes'])} / ~{format_bytes(total)}"
+                f" · {format_speed(summary['speed'])}"
+                f" · ETA {format_duration(int(eta)) if eta is not None else '--:--'}"
+            )
+        )
+
+        if summary["done"]:
+            self.batch_btn.config(state="enabled")
+            self.log_status(
+                f"📦 Batch finished: {summary['completed']} done,"
+                f" {summary['failed']} failed"
+                + (f", {summary['cancelled']} cancelled" if summary["cancelled"] else "")
+            )
+
     def reset_progress(self):
         self.progress_bar["value"] = 0
         self.progress_label.config(text="0%")
 
-    def log_status(self, msg):
-        self.status.config(state="normal")
-        self.status.insert("end", msg + "\n")
-        self.status.see("end")
-        self.status.config(state="disabled")
+    def update_queue(self, stats):
+        idle = not stats["running"] and not stats["queued"]
+        self.pause_btn.config(text="▶️ Resume" if idle and stats["paused"] else "⏸️ Pause")
+        if idle and not stats["paused"]:
+            self.queue_label.config(text="Queue: idle")
+            return
+        text = f"Queue: {stats['running']} running · {stats['queued']} waiting"
+        if stats["paused"]:
+            text += f" · {stats['paused']} paused"
+        self.queue_label.config(text=text)
+
+    # Safe to call from any thread; the widget is updated by _flush_log.
+    def log_status(self, msg, level="info"):
+        self.log.append(msg, level)
+
+    def _flush_log(self):
+        pending = self.log.take_pending()
+        if pending:
+            self.status.config(state="normal")
+            self.status.insert("end", "".join(r.message + "\n" for r in pending))
+            lines = int(self.status.index("end-1c").split(".")[0]) - 1
+            if lines > LOG_MAX_LINES:
+                self.status.delete("1.0", f"{lines - LOG_MAX_LINES + 1}.0")
+            self.status.see("end")
+            self.status.config(state="disabled")
+        self.root.after(LOG_FLUSH_MS, self._flush_log)
 
     def enable_fetch(self):
         self.fetch_btn.config(state="enabled")
@@ -441,6 +708,44 @@ class MainView:
             background=[("active", bg_light)]
         )
         
+        style.configure(
+            "Small.TButton",
+            background=bg_medium,
+            foreground=text_primary,
+            bordercolor=border,
+            lightcolor=bg_medium,
+            darkcolor=bg_medium,
+            padding=(8, 4),
+            font=("Segoe UI", 9)
+        )
+        style.map(
+            "Small.TButton",
+            background=[("active", bg_light), ("pressed", bg_dark)]
+        )
+
+        # Notebook style
+        style.configure(
+            "Modern.TNotebook",
+            background=bg_dark,
+            bordercolor=bg_dark,
+            tabmargins=0
+        )
+        style.configure(
+            "Modern.TNotebook.Tab",
+            background=bg_dark,
+            foreground=text_secondary,
+            bordercolor=bg_dark,
+            lightcolor=bg_dark,
+            padding=(14, 6),
+            font=("Segoe UI", 9)
+        )
+        style.map(
+            "Modern.TNotebook.Tab",
+            background=[("selected", bg_medium)],
+            foreground=[("selected", text_primary)],
+            lightcolor=[("selected", bg_medium)]
+        )
+
         # Progressbar style
         style.configure(
             "Modern.Horizontal.TProgressbar",
@@ -457,6 +762,7 @@ class MainView:
     # =========================
     def _set_type(self, t):
         self.download_type.set(t)
+        self._fill_quality_menu()
         active_style = "Type.TButton"
         # Update active state visuals
         if t == "video":
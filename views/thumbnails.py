@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from utils.constants import THUMBNAIL_CACHE_DIR, THUMBNAIL_REVALIDATE_AFTER
+
+# resize() first shrinks by an integer factor (JPEG DCT scaling or
+# Image.reduce) while the image stays at least this many times the target
+# size, and only filters the rest.
+REDUCING_GAP = 2.0
+
+
+def _photo_image(image):
+    from PIL import ImageTk
+
+    return ImageTk.PhotoImage(image)
+
+
+# Centred box with the aspect ratio of `size` inside a (width, height)
+# image; this also cuts the black bars off letterboxed 4:3 thumbnails.
+def _crop_box(width, height, size):
+    aspect = size[0] / size[1]
+    if width / height > aspect:
+        crop = height * aspect
+        return ((width - crop) / 2, 0, (width + crop) / 2, height)
+    crop = width / aspect
+    return (0, (height - crop) / 2, width, (height + crop) / 2)
+
+
+# The smallest entry of info["thumbnails"] whose cropped area still covers
+# `size`, preferring JPEG on a tie since it decodes in draft mode. Entries
+# without dimensions are only used through the info["thumbnail"] fallback.
+def pick_thumbnail(info, size):
+    best = None
+    for thumb in info.get("thumbnails") or ():
+        width, height, url = thumb.get("width"), thumb.get("height"), thumb.get("url")
+        if not (width and height and url):
+            continue
+        left, top, right, bottom = _crop_box(width, height, size)
+        if right - left < size[0] or bottom - top < size[1]:
+            continue
+        key = (width * height, not url.split("?")[0].endswith(".jpg"))
+        if best is None or key < best[0]:
+            best = (key, url)
+    return best[1] if best else info.get("thumbnail")
+
+
+# Fetches, decodes and resizes thumbnails on worker threads and hands the
+# result back to the Tk thread as a PhotoImage. Resized images are kept in
+# a small in-memory LRU and written to disk, so showing the same video
+# again never touches the network. Use pick() to choose which of a video's
+# thumbnails to load.
+#
+# Downloads go through the shared keep-alive HTTP client. A disk entry
+# older than `revalidate_after` is still shown at once, and refreshed in
+# the background with a conditional GET using the ETag/Last-Modified it
+# was stored with.
+class ThumbnailLoader:
+    # `resample` is the name of a PIL.Image.Resampling filter, or None for
+    # Pillow's default. Pillow itself is imported on first use.
+    def __init__(self, root, size, resample=None, cache_dir=THUMBNAIL_CACHE_DIR,
+                 max_memory=64, max_disk=500, workers=2, http=None,
+                 revalidate_after=THUMBNAIL_REVALIDATE_AFTER):
+        self.root = root
+        self.size = size
+        self.resample = resample
+        self.cache_dir = cache_dir
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self._http = http
+        self.revalidate_after = revalidate_after
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="thumbnail"
+        )
+
+    def pick(self, info):
+        return pick_thumbnail(info, self.size)
+
+    # `callback` runs on the Tk thread with a PhotoImage, or None on error.
+    def load(self, url, callback):
+        with self._lock:
+            image = self._memory.get(url)
+            if image is not None:
+                self._memory.move_to_end(url)
+
+        if image is not None:
+            callback(_photo_image(image))
+            return
+
+        future = self._executor.submit(self._fetch, url)
+        future.add_done_callback(
+            lambda f: self.root.after(0, self._deliver, url, f, callback)
+        )
+
+    def _deliver(self, url, future, callback):
+        try:
+            image = future.result()
+        except Exception:
+            callback(None)
+            return
+
+        with self._lock:
+            self._memory[url] = image
+            self._memory.move_to_end(url)
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+        callback(_photo_image(image))
+
+    def _fetch(self, url):
+        from PIL import Image
+
+        path = self._disk_path(url)
+        if os.path.exists(path):
+            os.utime(path)
+            cached = self._load_validators(path)
+            if cached and time.time() - cached.get("checked", 0) > self.revalidate_after:
+                self._executor.submit(self._revalidate, url, path, cached)
+            with Image.open(path) as cached_image:
+                cached_image.load()
+                return cached_image.copy()
+        return self._download(url, path)
+
+    # Returns the decoded image, or None if `cached` validators were given
+    # and the server says the stored copy is still current.
+    def _download(self, url, path, cached=None):
+        from PIL import Image
+        from utils.http import validators
+
+        response = self._client().get(url, validators=cached)
+        if response.status == 304:
+            self._save_validators(path, cached)
+            return None
+
+        with Image.open(BytesIO(response.body)) as source:
+            resample = getattr(Image.Resampling, self.resample) if self.resample else None
+            image = self._decode(source, resample)
+
+        self._store(path, image, validators(response))
+        return image
+
+    # utils.http pulls in ssl and http.client, so the shared client is only
+    # looked up once the first thumbnail is downloaded, off the Tk thread.
+    def _client(self):
+        if self._http is None:
+            from utils.http import shared_client
+            self._http = shared_client()
+        return self._http
+
+    def _revalidate(self, url, path, cached):
+        try:
+            image = self._download(url, path, cached)
+        except Exception:
+            return
+        if image is not None:
+            with self._lock:
+                if url in self._memory:
+                    self._memory[url] = image
+
+    # Crops to the preview's aspect ratio and scales down. JPEGs are decoded
+    # straight at a reduced scale (draft mode); other formats are shrunk by
+    # Image.reduce inside resize() before the resampling filter runs.
+    def _decode(self, source, resample):
+        width, height = source.size
+        left, top, right, bottom = _crop_box(width, height, self.size)
+        scale = min((right - left) / self.size[0], (bottom - top) / self.size[1])
+        if scale > 1:
+            source.draft("RGB", (int(width / scale), int(height / scale)))
+            rx, ry = source.size[0] / width, source.size[1] / height
+            left, top, right, bottom = left * rx, top * ry, right * rx, bottom * ry
+        return source.convert("RGB").resize(
+            self.size, resample, box=(left, top, right, bottom), reducing_gap=REDUCING_GAP
+        )
+
+    def _disk_path(self, url):
+        digest = hashlib.sha1(f"{url}|{self.size}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.jpg")
+
+    def _store(self, path, image, cached):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            image.save(tmp, "JPEG", quality=90)
+            os.replace(tmp, path)
+            if cached:
+                self._save_validators(path, cached)
+            self._prune_disk()
+        except OSError:
+            pass
+
+    # ETag/Last-Modified of a stored thumbnail and when they were last
+    # confirmed, in "<file>.json".
+    @staticmethod
+    def _load_validators(path):
+        try:
+            with open(path + ".json", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _save_validators(path, cached):
+        tmp = f"{path}.json.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({**cached, "checked": time.time()}, f)
+            os.replace(tmp, path + ".json")
+        except OSError:
+            pass
+
+    def _prune_disk(self):
+        entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".jpg")]
+        if len(entries) <= self.max_disk:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_disk]:
+            for stale in (entry.path, entry.path + ".json"):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)